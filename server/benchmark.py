@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for Appear Lite Plus hot paths
+Runs against a throwaway database so live data is never touched.
+
+Usage: python benchmark.py [auth] [notify] [parse] [startup] [replay] [replicate]
+                          [logging] [recent]
+"""
+
+import os
+import sys
+import socket
+import subprocess
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def setup_environment():
+    """Point the app at a temporary database directory"""
+    workdir = tempfile.mkdtemp(prefix='appear-bench-')
+    os.environ['DB_PATH'] = os.path.join(workdir, 'data', 'appear.db')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.chdir(workdir)
+    return workdir
+
+def report(name, count, elapsed):
+    print(f"  {name:<32} {count / elapsed:>10.0f} ops/s  {elapsed / count * 1e6:>9.1f} us/op")
+
+def bench_auth(count=2000):
+    """Authenticated API throughput: token verification vs bcrypt per request"""
+    from src import app as appmod
+
+    client = appmod.app.test_client()
+    token_auth = appmod.token_auth
+
+    print("API auth benchmark (GET /api/stats)")
+
+    token_auth.enabled = False
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get('/api/stats')
+    report("no auth", count, time.perf_counter() - start)
+
+    token_auth.enabled = True
+    token = client.post('/api/auth/token', json={'username': 'admin', 'password': 'admin',
+                                                 'device': 'bench'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get('/api/stats', headers=headers)
+    assert response.status_code == 200
+    report("token auth", count, time.perf_counter() - start)
+
+    bcrypt_count = max(count // 100, 5)
+    start = time.perf_counter()
+    for _ in range(bcrypt_count):
+        appmod.db.verify_user('admin', 'admin')
+        client.get('/api/stats', headers=headers)
+    report("bcrypt per request", bcrypt_count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(count * 10):
+        token_auth.verify(token)
+    report("token verify only", count * 10, time.perf_counter() - start)
+    # Later benchmarks share this app and expect the API open
+    token_auth.enabled = False
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a webhook/push endpoint"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.bytes += len(body)
+        time.sleep(server.delay)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stand_in(delay=0.0):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.lock = threading.Lock()
+    server.requests = server.bytes = server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def bench_notify(count=500):
+    """Notification fan-out: fast batched target next to a slow one"""
+    from src.database.db import Database
+    from src.notifications.dispatcher import NotificationDispatcher
+
+    fast = start_stand_in()
+    slow = start_stand_in(delay=0.5)
+    db = Database(os.environ['DB_PATH'])
+    dispatcher = NotificationDispatcher(db, [
+        {'name': 'fast', 'provider': 'webhook', 'batch_size': 20, 'max_concurrency': 2,
+         'url': f'http://127.0.0.1:{fast.server_port}/hook'},
+        {'name': 'slow', 'provider': 'http_push', 'max_concurrency': 1,
+         'url': f'http://127.0.0.1:{slow.server_port}/push'},
+    ])
+    dispatcher.start()
+
+    print(f"Notification benchmark ({count} alarms, fast webhook + 0.5s push target)")
+    start = time.perf_counter()
+    for i in range(count):
+        dispatcher.enqueue({'id': i, 'source': 'bench', 'message': f'Bench alarm {i}'})
+    report("enqueue (ingest side)", count, time.perf_counter() - start)
+
+    while dispatcher.get_stats()['fast']['sent'] < count:
+        time.sleep(0.01)
+    report("fast target delivered", count, time.perf_counter() - start)
+    stats = dispatcher.get_stats()
+    print(f"  fast: {fast.requests} requests over {fast.connections} connection(s); "
+          f"slow: {stats['slow']['sent']} sent, {stats['slow']['queued']} still queued")
+    dispatcher.stop()
+    fast.shutdown()
+    slow.shutdown()
+
+PARSE_SAMPLES = {
+    'raw': 'FIRE ALARM ZONE 3 POINT 1-2-3 PANEL 2 10/15/24 14:02:11',
+    'fire_panel': 'TROUBLE L01D023 SMOKE DET 2ND FLR Z005 02:14P 011524',
+    'tap': '\x021234567\rFIRE ALARM ZONE 12 LOBBY PULL STATION\r\x03A1B',
+    'pocsag': 'POCSAG1200: Address:  1234567  Function: 0  Alpha:   FIRE ALARM Z7 12:00',
+    'regex': 'P1|ALARM|4|Smoke detector east stairwell',
+}
+
+def bench_parse(count=50000):
+    """Parser throughput in messages per second"""
+    from src.parsers.examples import EXAMPLES, check_examples
+    from src.parsers.registry import create_parser
+
+    failures = check_examples()
+    print(f"Parser benchmark ({len(EXAMPLES) - len(failures)}/{len(EXAMPLES)} examples parse as expected)")
+    for name, line, expected, actual in failures:
+        print(f"  [FAIL] {name}: {line!r} expected {expected}, got {actual}")
+    for name, sample in PARSE_SAMPLES.items():
+        pattern = r'^(?P<panel>\w+)\|(?P<event_type>\w+)\|(?P<zone>\d+)\|(?P<message>.*)$'
+        parser = create_parser(name, pattern)
+        start = time.perf_counter()
+        for _ in range(count):
+            parser.parse(sample)
+        report(name, count, time.perf_counter() - start)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, deadline):
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return time.time()
+        except OSError:
+            time.sleep(0.005)
+    return None
+
+def bench_startup(runs=2):
+    """Cold start of run.py: time until the alarm port and the web port accept connections"""
+    from src.database.db import Database
+
+    db = Database(os.environ['DB_PATH'])
+    serial_ip_port, tap_port, web_port = free_port(), free_port(), free_port()
+    db.update_setting('serial_ip_port', str(serial_ip_port))
+    db.update_setting('tap_port', str(tap_port))
+    db.update_setting('serial_enabled', 'false')
+
+    run_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run.py')
+    env = dict(os.environ, FLASK_HOST='127.0.0.1', FLASK_PORT=str(web_port))
+
+    print("Startup benchmark (python run.py)")
+    for run in range(runs):
+        label = 'schema migration' if run == 0 else 'schema current'
+        if run == 0:
+            # Force the migration path a fresh install or upgrade takes
+            conn = db.get_connection()
+            conn.execute('PRAGMA user_version = 0')
+            conn.close()
+
+        start = time.time()
+        process = subprocess.Popen([sys.executable, run_py], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            ingest_ready = wait_for_port(serial_ip_port, start + 60)
+            web_ready = wait_for_port(web_port, start + 60)
+        finally:
+            process.terminate()
+            process.wait()
+
+        if ingest_ready is None or web_ready is None:
+            print(f"  {label}: server did not come up")
+            continue
+        print(f"  {label:<18} ingest ready {ingest_ready - start:6.3f}s   web ready {web_ready - start:6.3f}s")
+
+def bench_replay(connections=8, messages=500):
+    """Record a synthetic alarm storm, then replay it into fresh listeners at full speed"""
+    from src.capture.recorder import CaptureRecorder, capture_files
+    from src.capture.replay import replay
+    from src.handlers.connection_limiter import ConnectionLimiter
+    from src.handlers.serial_ip_handler import SerialIPHandler
+    from src.handlers.tap_handler import TAPHandler
+
+    def start_listeners(received, capture=None):
+        tap = TAPHandler('127.0.0.1', free_port(), lambda alarm: received.append(alarm['id']),
+                         limiter=ConnectionLimiter(rate=0), capture=capture)
+        serial_ip = SerialIPHandler('127.0.0.1', free_port(), lambda alarm: received.append(alarm['id']),
+                                    limiter=ConnectionLimiter(rate=0), capture=capture)
+        tap.start()
+        serial_ip.start()
+        for handler in (tap, serial_ip):
+            wait_for_port(handler.port, time.time() + 5)
+        return tap, serial_ip
+
+    def wait_for(received, total):
+        deadline = time.time() + 120
+        while len(received) < total and time.time() < deadline:
+            time.sleep(0.01)
+
+    capture_path = os.path.join(os.path.dirname(os.environ['DB_PATH']), 'capture', 'bench.cap')
+    recorder = CaptureRecorder(capture_path, max_bytes=64 * 1024)
+    received = []
+    tap, serial_ip = start_listeners(received, recorder)
+    total = connections * messages
+
+    print(f"Replay benchmark ({connections} connections x {messages} messages)")
+    start = time.perf_counter()
+    for index in range(connections):
+        if index % 2:
+            sock = socket.create_connection(('127.0.0.1', serial_ip.port))
+            sock.sendall(b''.join(f"FIRE ALARM ZONE {n % 40} POINT 1-{index}-{n}\n".encode()
+                                  for n in range(messages)))
+        else:
+            sock = socket.create_connection(('127.0.0.1', tap.port))
+            sock.sendall(b''.join(f"\x02{index}\rTROUBLE Z{n % 40} L01D{n % 100:03d}\r\x03000\x1b\x04".encode()
+                                  for n in range(messages)))
+        sock.shutdown(socket.SHUT_WR)
+        while sock.recv(4096):
+            pass
+        sock.close()
+    wait_for(received, total)
+    report("live ingest", total, time.perf_counter() - start)
+    tap.stop()
+    serial_ip.stop()
+    recorder.shutdown()
+
+    files = capture_files(capture_path)
+    replayed = []
+    tap, serial_ip = start_listeners(replayed)
+    start = time.perf_counter()
+    stats = replay(files, {'tap': tap.port, 'serial_ip': serial_ip.port}, host='127.0.0.1', speed=0)
+    wait_for(replayed, total)
+    report("replay at full speed", total, time.perf_counter() - start)
+    print(f"  {len(files)} capture file(s), {stats['bytes']} bytes, {len(replayed)}/{total} alarms reproduced")
+    tap.stop()
+    serial_ip.stop()
+
+def bench_replicate(count=20000, batch_size=1000):
+    """Pull a remote site's alarm feed into a second database over HTTP"""
+    from werkzeug.serving import make_server
+    from src import app as appmod
+    from src.database.db import Database
+    from src.replication.replicator import Replicator
+
+    # Site A: the app under DB_PATH, seeded directly for speed
+    conn = appmod.db.get_connection()
+    conn.executemany('INSERT INTO alarms (source, message, raw_data, event_type, zone) VALUES (?, ?, ?, ?, ?)',
+                     [('serial_ip', f'FIRE ALARM ZONE {n % 40} SMOKE DET FLOOR {n % 12}',
+                       f'From (10.0.0.5, 4001): FIRE ALARM ZONE {n % 40}', 'FIRE ALARM', str(n % 40))
+                      for n in range(count)])
+    conn.commit()
+    conn.close()
+    appmod.db.update_setting('site_name', 'site-a')
+
+    server = make_server('127.0.0.1', free_port(), appmod.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+
+    # Site B: a separate database pulling from A
+    site_b = Database(os.path.join(os.path.dirname(os.environ['DB_PATH']), 'site-b.db'))
+    replicator = Replicator(site_b, [{'name': 'site-a', 'url': url}], batch_size=batch_size)
+    peer = replicator.peers[0]
+
+    print(f"Replication benchmark ({count} alarms seeded, batch {batch_size})")
+    # Site A may already hold alarms from earlier benchmarks, so count what actually arrives
+    start = time.perf_counter()
+    pulled = 0
+    while True:
+        received = replicator.sync_once(peer)
+        pulled += received
+        if received != batch_size:
+            break
+    report("pull + merge", pulled, time.perf_counter() - start)
+
+    import urllib.request
+    with urllib.request.urlopen(f'{url}/api/alarms/feed?since=0&limit={batch_size}') as response:
+        plain = len(response.read())
+    print(f"  {peer.bytes_received} bytes gzip vs ~{plain * pulled // batch_size} uncompressed; "
+          f"{site_b.get_alarm_stats()['total']} alarms at site B")
+
+    # A second pass resumes from the checkpoint and transfers nothing new
+    start = time.perf_counter()
+    received = replicator.sync_once(peer)
+    print(f"  resume from checkpoint: {received} new alarms in {(time.perf_counter() - start) * 1000:.1f} ms")
+    server.shutdown()
+
+def bench_logging(connections=4, messages=1000, calls=50000):
+    """Ingest throughput and per-call cost with logging off, synchronous and queued"""
+    import logging
+    import logging.handlers
+    import queue
+    from src.handlers.connection_limiter import ConnectionLimiter
+    from src.handlers.serial_ip_handler import SerialIPHandler
+    from src.log_setup import (FORMAT, NonBlockingQueueHandler, RepeatFilter, SamplingFilter,
+                               get_log_stats)
+
+    log_path = os.path.join(os.path.dirname(os.environ['DB_PATH']), 'bench.log')
+    root = logging.getLogger()
+    hot_logger = logging.getLogger('src.handlers.serial_ip_handler')
+    total = connections * messages
+
+    def file_handler():
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter(FORMAT))
+        return handler
+
+    def queued(*filters):
+        handler = NonBlockingQueueHandler(queue.Queue(10000))
+        for log_filter in filters:
+            handler.addFilter(log_filter)
+        listener = logging.handlers.QueueListener(handler.queue, file_handler())
+        return handler, listener
+
+    def configure(level, handler):
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        if handler:
+            root.addHandler(handler)
+        root.setLevel(level)
+
+    def ingest(label):
+        received = []
+        serial_ip = SerialIPHandler('127.0.0.1', free_port(), lambda alarm: received.append(alarm['id']),
+                                    limiter=ConnectionLimiter(rate=0))
+        serial_ip.start()
+        wait_for_port(serial_ip.port, time.time() + 5)
+
+        start = time.perf_counter()
+        socks = []
+        for index in range(connections):
+            sock = socket.create_connection(('127.0.0.1', serial_ip.port))
+            sock.sendall(b''.join(f"FIRE ALARM ZONE {n % 40} POINT 1-{index}-{n}\n".encode()
+                                  for n in range(messages)))
+            socks.append(sock)
+        deadline = time.time() + 120
+        while len(received) < total and time.time() < deadline:
+            time.sleep(0.005)
+        report(label, total, time.perf_counter() - start)
+        for sock in socks:
+            sock.close()
+        serial_ip.stop()
+
+    def call_cost(label):
+        start = time.perf_counter()
+        for n in range(calls):
+            hot_logger.info("Received alarm from Serial over IP (%s): %.100s", ('10.0.0.5', 4001),
+                            f"FIRE ALARM ZONE {n % 40}")
+        report(label, calls, time.perf_counter() - start)
+
+    setups = [
+        ("logging off", logging.WARNING, lambda: (None, None)),
+        ("synchronous file", logging.INFO, lambda: (file_handler(), None)),
+        ("queued", logging.INFO, queued),
+        ("queued + sample/repeat", logging.INFO,
+         lambda: queued(SamplingFilter({'src.handlers': 10}), RepeatFilter(20, 60))),
+    ]
+
+    print(f"Logging benchmark (ingest: {connections} connections x {messages} alarms over Serial over IP)")
+    for run in (ingest, call_cost):
+        if run is call_cost:
+            print(f"  Per-call cost on the logging thread ({calls} INFO records)")
+        for label, level, make in setups:
+            handler, listener = make()
+            if listener:
+                listener.start()
+            configure(level, handler)
+            run(label)
+            configure(logging.WARNING, None)
+            if listener:
+                listener.stop()
+    print(f"  {get_log_stats()}; {os.path.getsize(log_path)} bytes written")
+
+def bench_recent(count=20000, requests=2000):
+    """Hot alarm reads from the in-memory recent window vs SQLite"""
+    from flask import jsonify
+    from src import app as appmod
+
+    db = appmod.db
+    conn = db.get_connection()
+    conn.executemany('INSERT INTO alarms (source, message, raw_data, event_type, zone) VALUES (?, ?, ?, ?, ?)',
+                     [('tap', f'FIRE ALARM ZONE {n % 40} PULL STATION {n}', f'\x02{n}\rFIRE ALARM\r\x03',
+                       'FIRE ALARM', str(n % 40)) for n in range(count)])
+    conn.commit()
+    conn.close()
+    db.warm_recent_alarms()
+
+    client = appmod.app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = 'admin'
+
+    print(f"Recent alarms benchmark ({count} alarms in the table)")
+    with appmod.app.app_context():
+        start = time.perf_counter()
+        for _ in range(requests):
+            body = jsonify([dict(alarm) for alarm in db._fetch_recent_alarms(100)]).get_data()
+        report("latest 100 from SQLite + jsonify", requests, time.perf_counter() - start)
+    assert client.get('/api/alarms/latest?limit=100').get_data() == body
+
+    for label, url in (("GET /api/alarms/latest?limit=100", '/api/alarms/latest?limit=100'),
+                       ("GET /alarms (100 rows)", '/alarms'), ("GET /debug (50 rows)", '/debug')):
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        report(label, requests, time.perf_counter() - start)
+
+    # Ingest keeps the window current without a re-query
+    start = time.perf_counter()
+    for n in range(requests):
+        db.save_alarm('serial_ip', f'TROUBLE ZONE {n % 40}', fields={'zone': str(n % 40)})
+        db.get_recent_alarms_json(50)
+    report("save + latest 50", requests, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    client.get(f'/api/alarms/latest?limit={db.RECENT_CAPACITY * 4}')
+    print(f"  older page (limit {db.RECENT_CAPACITY * 4}, from SQLite): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+BENCHMARKS = {
+    'auth': bench_auth,
+    'notify': bench_notify,
+    'parse': bench_parse,
+    'startup': bench_startup,
+    'replay': bench_replay,
+    'replicate': bench_replicate,
+    'logging': bench_logging,
+    'recent': bench_recent,
+}
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+
+    setup_environment()
+    print("=" * 60)
+    for name in names:
+        BENCHMARKS[name]()
+        print("=" * 60)
+
+if __name__ == '__main__':
+    main()
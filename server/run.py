@@ -2,23 +2,36 @@
 """
 Appear Lite Plus - Raspberry Pi Alarm Messaging System
 Main entry point for the application
+
+Alarm listeners are started before Flask/SocketIO are imported so alarms
+arriving while the Pi boots are captured as early as possible.
 """
 
+import time
+process_start = time.time()
+
 import sys
 import os
 
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.app import app, socketio, logger, start_handlers
+from src import ingest
 
 if __name__ == '__main__':
+    ingest.mark_startup('process_start', process_start)
+    logger = ingest.logger
+
     logger.info("=" * 50)
     logger.info("Starting Appear Lite Plus")
     logger.info("=" * 50)
 
-    # Start alarm handlers
-    start_handlers()
+    # Start alarm handlers first; alarms are stored and queued for broadcast
+    ingest.start_handlers()
+
+    # Load the web stack
+    from src.app import app, socketio
+    ingest.mark_startup('web_loaded')
 
     # Get configuration from environment
     host = os.getenv('FLASK_HOST', '0.0.0.0')
@@ -28,5 +41,5 @@ if __name__ == '__main__':
     logger.info("Default login: admin/admin")
     logger.info("=" * 50)
 
-    # Run the application
-    socketio.run(app, host=host, port=port, debug=True, allow_unsafe_werkzeug=True)
+    # Run the application (the reloader would re-run startup and rebind the alarm ports)
+    socketio.run(app, host=host, port=port, debug=True, use_reloader=False, allow_unsafe_werkzeug=True)
@@ -1,17 +1,13 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, g
 from flask_socketio import SocketIO, emit
 from functools import wraps
 import os
 import logging
-from dotenv import load_dotenv
 
-from src.database.db import Database
-from src.handlers.serial_handler import SerialHandler
-from src.handlers.tap_handler import TAPHandler
-from src.handlers.serial_ip_handler import SerialIPHandler
-
-# Load environment variables
-load_dotenv()
+# Loads .env and configures logging before anything else reads them
+from src import ingest
+from src.auth.tokens import TokenAuth
+from src.replication.feed import generate_feed, get_site_name
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -20,21 +16,29 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-pro
 # Initialize SocketIO with threading mode (compatible with Python 3.13)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
-# Setup logging
-log_level = os.getenv('LOG_LEVEL', 'INFO')
-logging.basicConfig(
-    level=getattr(logging, log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Initialize database
-db = Database(os.getenv('DB_PATH', 'data/appear.db'))
+# Initialize database (shared with the ingest handlers)
+db = ingest.get_db()
+
+# Initialize API token auth
+token_auth = TokenAuth(db, app.config['SECRET_KEY'])
+
+def configure_auth():
+    """Apply API auth settings without touching the DB on each request"""
+    token_auth.enabled = db.get_setting('api_auth_enabled', 'false').lower() == 'true'
+    ttl_days = db.get_setting('api_token_ttl_days', '30')
+    try:
+        ttl = int(float(ttl_days) * 86400)
+        if ttl <= 0:
+            raise ValueError('must be positive')
+    except (TypeError, ValueError, OverflowError):
+        # A bad value must not keep the web UI from starting; fall back to the default
+        logger.warning(f"Invalid api_token_ttl_days {ttl_days!r}, using 30 days")
+        ttl = 30 * 86400
+    token_auth.ttl = ttl
 
-# Initialize handlers
-serial_handler = None
-tap_handler = None
-serial_ip_handler = None
+configure_auth()
 
 # Authentication decorator
 def login_required(f):
@@ -45,10 +49,24 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def alarm_callback(alarm_data):
-    """Callback when new alarm received - send to connected apps"""
-    socketio.emit('new_alarm', alarm_data, namespace='/app')
-    logger.info(f"Alarm broadcasted to connected apps: {alarm_data['id']}")
+def get_request_token():
+    """Read an API token from the Authorization header or query string"""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[7:].strip()
+    return request.args.get('token')
+
+# API authentication decorator
+def api_auth_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if token_auth.enabled and 'user' not in session:
+            claims = token_auth.verify(get_request_token())
+            if not claims:
+                return jsonify({'error': 'unauthorized'}), 401
+            g.api_user = claims['sub']
+        return f(*args, **kwargs)
+    return decorated_function
 
 # Routes
 @app.route('/')
@@ -63,7 +81,7 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
 
-        if db.verify_user(username, password):
+        if token_auth.verify_password(username, password):
             session['user'] = username
             logger.info(f"User {username} logged in")
             return redirect(url_for('dashboard'))
@@ -102,16 +120,13 @@ def settings():
                 db.update_setting(setting_key, request.form[key])
 
         # Restart handlers if needed
+        configure_auth()
         restart_handlers()
 
         return redirect(url_for('settings'))
 
     all_settings = db.get_all_settings()
-    handler_status = {
-        'serial': serial_handler.is_running() if serial_handler else False,
-        'tap': tap_handler.is_running() if tap_handler else False,
-        'serial_ip': serial_ip_handler.is_running() if serial_ip_handler else False
-    }
+    handler_status = ingest.get_handler_status()
     return render_template('settings.html', settings=all_settings, status=handler_status, user=session['user'])
 
 @app.route('/debug')
@@ -119,36 +134,117 @@ def settings():
 def debug():
     recent_alarms = db.get_recent_alarms(limit=50)
     all_settings = db.get_all_settings()
-    handler_status = {
-        'serial': serial_handler.is_running() if serial_handler else False,
-        'tap': tap_handler.is_running() if tap_handler else False,
-        'serial_ip': serial_ip_handler.is_running() if serial_ip_handler else False
-    }
-    return render_template('debug.html', alarms=recent_alarms, settings=all_settings, status=handler_status, user=session['user'])
+    handler_status = ingest.get_handler_status()
+    return render_template('debug.html', alarms=recent_alarms, settings=all_settings, status=handler_status,
+                           connections=ingest.get_connection_stats(), health=ingest.get_handler_health(),
+                           user=session['user'])
 
 # API Routes for phone app
+@app.route('/api/auth/token', methods=['POST'])
+def api_issue_token():
+    """Exchange username/password for an API token"""
+    data = request.get_json(silent=True)
+    if data is None:
+        data = request.form.to_dict()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'expected a JSON object'}), 400
+    username, password, device = data.get('username'), data.get('password'), data.get('device')
+    if not (isinstance(username, str) and username and isinstance(password, str) and password):
+        return jsonify({'error': 'username and password are required'}), 400
+    if device is not None and not isinstance(device, str):
+        return jsonify({'error': 'device must be a string'}), 400
+    issued = token_auth.issue(username, password, device)
+    if not issued:
+        return jsonify({'error': 'invalid credentials'}), 401
+    return jsonify(issued)
+
+@app.route('/api/auth/revoke', methods=['POST'])
+def api_revoke_token():
+    """Revoke the token used to make this request"""
+    claims = token_auth.verify(get_request_token())
+    if not claims:
+        return jsonify({'error': 'unauthorized'}), 401
+    token_auth.revoke(claims['jti'])
+    return jsonify({'status': 'revoked'})
+
 @app.route('/api/alarms/latest', methods=['GET'])
+@api_auth_required
 def api_latest_alarms():
     """Get latest alarms for phone app"""
     limit = request.args.get('limit', 50, type=int)
-    alarms = db.get_recent_alarms(limit=limit)
-    return jsonify([dict(alarm) for alarm in alarms])
+    # Served from the in-memory recent window as pre-serialized JSON
+    return Response(db.get_recent_alarms_json(limit=limit) + '\n', mimetype='application/json')
+
+@app.route('/api/alarms/feed', methods=['GET'])
+@api_auth_required
+def api_alarm_feed():
+    """Stream local alarms after ?since=<id> as NDJSON for replication"""
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', 1000, type=int), 10000)
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    headers = {'X-Site-Name': get_site_name(db)}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(generate_feed(db, since, limit, compress=compress),
+                    mimetype='application/x-ndjson', headers=headers)
 
 @app.route('/api/alarms/<int:alarm_id>/mark_sent', methods=['POST'])
+@api_auth_required
 def api_mark_alarm_sent(alarm_id):
     """Mark alarm as sent to app"""
     db.mark_alarm_sent(alarm_id)
     return jsonify({'status': 'success'})
 
 @app.route('/api/stats', methods=['GET'])
+@api_auth_required
 def api_stats():
     """Get alarm statistics"""
     stats = db.get_alarm_stats()
     return jsonify(stats)
 
+@app.route('/api/connections', methods=['GET'])
+@api_auth_required
+def api_connections():
+    """Get connection admission and throttling counters"""
+    return jsonify(ingest.get_connection_stats())
+
+@app.route('/api/health', methods=['GET'])
+@api_auth_required
+def api_health():
+    """Get handler status, uptime, restarts, live connections and last-message age"""
+    return jsonify(ingest.get_handler_health())
+
+@app.route('/api/notifications', methods=['GET'])
+@api_auth_required
+def api_notifications():
+    """Get outbound notification delivery counters per target"""
+    dispatcher = ingest.notification_dispatcher
+    return jsonify(dispatcher.get_stats() if dispatcher else {})
+
+@app.route('/api/replication', methods=['GET'])
+@api_auth_required
+def api_replication():
+    """Get replication progress per peer site"""
+    replicator = ingest.replicator
+    return jsonify({
+        'site': get_site_name(db),
+        'peers': replicator.get_stats() if replicator else {}
+    })
+
+@app.route('/api/startup', methods=['GET'])
+@api_auth_required
+def api_startup():
+    """Get startup milestones (process start, ingest ready, web stack loaded)"""
+    return jsonify(ingest.get_startup_stats())
+
 # SocketIO events for phone app
 @socketio.on('connect', namespace='/app')
-def handle_app_connect():
+def handle_app_connect(auth=None):
+    if token_auth.enabled:
+        token = (auth or {}).get('token') or get_request_token()
+        if not token_auth.verify(token):
+            logger.warning("Rejected phone app connection: invalid or missing token")
+            return False
     logger.info("Phone app connected")
     emit('connected', {'status': 'connected'})
 
@@ -161,54 +257,12 @@ def handle_subscribe(data):
     logger.info(f"Phone app subscribed: {data}")
     emit('subscribed', {'status': 'subscribed'})
 
-def start_handlers():
-    """Start serial, TAP, and Serial over IP handlers based on settings"""
-    global serial_handler, tap_handler, serial_ip_handler
-
-    # Start serial handler if enabled
-    if db.get_setting('serial_enabled', 'false').lower() == 'true':
-        try:
-            serial_port = db.get_setting('serial_port', '/dev/ttyUSB0')
-            serial_baud = db.get_setting('serial_baud_rate', '9600')
-            serial_handler = SerialHandler(serial_port, serial_baud, alarm_callback)
-            serial_handler.start()
-        except Exception as e:
-            logger.error(f"Failed to start serial handler: {e}")
-
-    # Start TAP handler if enabled
-    if db.get_setting('tap_enabled', 'false').lower() == 'true':
-        try:
-            tap_host = db.get_setting('tap_host', '0.0.0.0')
-            tap_port = db.get_setting('tap_port', '18001')
-            tap_handler = TAPHandler(tap_host, tap_port, alarm_callback)
-            tap_handler.start()
-        except Exception as e:
-            logger.error(f"Failed to start TAP handler: {e}")
-
-    # Start Serial over IP handler if enabled
-    if db.get_setting('serial_ip_enabled', 'false').lower() == 'true':
-        try:
-            serial_ip_host = db.get_setting('serial_ip_host', 'localhost')
-            serial_ip_port = db.get_setting('serial_ip_port', '5001')
-            serial_ip_handler = SerialIPHandler(serial_ip_host, serial_ip_port, alarm_callback)
-            serial_ip_handler.start()
-        except Exception as e:
-            logger.error(f"Failed to start Serial over IP handler: {e}")
-
-def restart_handlers():
-    """Restart handlers with new settings"""
-    global serial_handler, tap_handler, serial_ip_handler
-
-    # Stop existing handlers
-    if serial_handler:
-        serial_handler.stop()
-    if tap_handler:
-        tap_handler.stop()
-    if serial_ip_handler:
-        serial_ip_handler.stop()
-
-    # Start with new settings
-    start_handlers()
+# Deliver alarms to phone apps once SocketIO exists
+ingest.set_broadcaster(lambda alarm_data: socketio.emit('new_alarm', alarm_data, namespace='/app'))
+
+# Kept for callers that import these from the app module
+start_handlers = ingest.start_handlers
+restart_handlers = ingest.restart_handlers
 
 if __name__ == '__main__':
     logger.info("Starting Appear Lite Plus server...")
@@ -217,4 +271,4 @@ if __name__ == '__main__':
     host = os.getenv('FLASK_HOST', '0.0.0.0')
     port = int(os.getenv('FLASK_PORT', 5000))
 
-    socketio.run(app, host=host, port=port, debug=True, allow_unsafe_werkzeug=True)
+    socketio.run(app, host=host, port=port, debug=True, use_reloader=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+class PasswordCache:
+    """Remembers recent successful bcrypt checks so repeat logins skip the hash"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        # Per-process key so cached digests are useless outside this process
+        self.key = os.urandom(32)
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _digest(self, username, password):
+        return hmac.new(self.key, f"{username}\x00{password}".encode('utf-8'), hashlib.sha256).digest()
+
+    def verify(self, db, username, password):
+        if not username or not password:
+            return False
+
+        digest = self._digest(username, password)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.entries.get(username)
+        if cached and cached[1] > now and hmac.compare_digest(cached[0], digest):
+            return True
+
+        if not db.verify_user(username, password):
+            return False
+
+        with self.lock:
+            self.entries[username] = (digest, now + self.ttl)
+        return True
+
+    def invalidate(self, username):
+        with self.lock:
+            self.entries.pop(username, None)
+
+class TokenAuth:
+    """Issues and verifies signed, expiring API tokens for phone apps"""
+
+    def __init__(self, db, secret_key, ttl_days=30, password_cache=None):
+        self.db = db
+        self.enabled = False
+        self.secret = hashlib.sha256(f"api-token:{secret_key}".encode('utf-8')).digest()
+        self.ttl = int(float(ttl_days) * 86400)
+        self.passwords = password_cache or PasswordCache()
+        self.revoked = set(db.get_revoked_token_ids())
+
+    def _sign(self, payload):
+        return hmac.new(self.secret, payload.encode('ascii'), hashlib.sha256).digest()
+
+    def verify_password(self, username, password):
+        return self.passwords.verify(self.db, username, password)
+
+    def issue(self, username, password, device=None):
+        """Check credentials (the only bcrypt step) and return a new token, or None"""
+        if not self.verify_password(username, password):
+            return None
+
+        token_id = secrets.token_hex(8)
+        expires_at = int(time.time()) + self.ttl
+        claims = {'jti': token_id, 'sub': username, 'dev': device or '', 'exp': expires_at}
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        token = f"{payload}.{_b64encode(self._sign(payload))}"
+
+        self.db.save_api_token(token_id, username, device, expires_at)
+        logger.info(f"Issued API token {token_id} for {username} ({device or 'unknown device'})")
+        return {'token': token, 'token_id': token_id, 'expires_at': expires_at}
+
+    def verify(self, token):
+        """Return the token claims if valid, otherwise None. No DB or bcrypt work."""
+        if not token or token.count('.') != 1:
+            return None
+
+        payload, signature = token.split('.')
+        try:
+            expected = self._sign(payload)
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (ValueError, UnicodeError):
+            return None
+
+        if claims.get('exp', 0) < time.time() or claims.get('jti') in self.revoked:
+            return None
+        return claims
+
+    def revoke(self, token_id):
+        self.revoked.add(token_id)
+        self.db.revoke_api_token(token_id)
+        logger.info(f"Revoked API token {token_id}")
@@ -0,0 +1 @@
+# Capture package
@@ -0,0 +1,136 @@
+import os
+import struct
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# File layout: MAGIC, then records of RECORD header + payload.
+# Header: timestamp (float64), connection id (uint32), event (uint8),
+# source (uint8), payload length (uint32). Little-endian throughout.
+# Each recorder starts with a SESSION record; connection IDs restart at 1
+# after it, and connections from earlier sessions are over.
+MAGIC = b'APCAP1\n'
+RECORD = struct.Struct('<dIBBI')
+
+EVENT_OPEN = 0
+EVENT_DATA = 1
+EVENT_CLOSE = 2
+EVENT_SESSION = 3
+
+SOURCES = {'tap': 1, 'serial_ip': 2}
+SOURCE_NAMES = {code: name for name, code in SOURCES.items()}
+
+class CaptureRecorder:
+    """Append raw inbound bytes to a size-rotated binary capture log"""
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.backup_count = int(backup_count)
+        self.lock = threading.Lock()
+        self.next_id = 1
+        # Connections still open: {conn_id: source}, closed out on shutdown()
+        self.open_ids = {}
+        self.file = None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._open()
+        self._write(0, EVENT_SESSION, None)
+
+    @classmethod
+    def from_settings(cls, db):
+        """Build a recorder from the capture_* settings, or None when disabled"""
+        if db.get_setting('capture_enabled', 'false').lower() != 'true':
+            return None
+        return cls(
+            db.get_setting('capture_path', 'data/capture/ingest.cap'),
+            max_bytes=db.get_setting('capture_max_bytes', '10485760'),
+            backup_count=db.get_setting('capture_backup_count', '5')
+        )
+
+    def _open(self):
+        self.file = open(self.path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def _rotate(self):
+        self.file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                older = f"{self.path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write(self, conn_id, event, source, payload=b''):
+        with self.lock:
+            self._write_locked(conn_id, event, source, payload)
+
+    def _write_locked(self, conn_id, event, source, payload=b''):
+        if self.file is None:
+            return
+        record = RECORD.pack(time.time(), conn_id, event, SOURCES.get(source, 0), len(payload)) + payload
+        if self.max_bytes > 0 and self.file.tell() + len(record) > self.max_bytes:
+            self._rotate()
+        self.file.write(record)
+        self.file.flush()
+
+    def open(self, source, client_address):
+        """Record a new connection and return its capture ID"""
+        with self.lock:
+            conn_id = self.next_id
+            self.next_id += 1
+            self.open_ids[conn_id] = source
+        self._write(conn_id, EVENT_OPEN, source, f"{client_address[0]}:{client_address[1]}".encode('utf-8'))
+        return conn_id
+
+    def data(self, conn_id, source, payload):
+        self._write(conn_id, EVENT_DATA, source, payload)
+
+    def close(self, conn_id, source):
+        with self.lock:
+            if self.open_ids.pop(conn_id, None) is not None:
+                self._write_locked(conn_id, EVENT_CLOSE, source)
+
+    def shutdown(self):
+        with self.lock:
+            # Clients still connected write their CLOSE after this recorder is gone
+            for conn_id, source in self.open_ids.items():
+                self._write_locked(conn_id, EVENT_CLOSE, source)
+            self.open_ids = {}
+            if self.file:
+                self.file.close()
+                self.file = None
+
+def capture_files(path):
+    """A capture and its rotated backups, oldest first"""
+    backups = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        backups.append(f"{path}.{index}")
+        index += 1
+    files = list(reversed(backups))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+def read_capture(paths):
+    """Yield (timestamp, conn_id, event, source, payload) from capture files in order"""
+    for path in paths:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a capture file")
+            while True:
+                header = f.read(RECORD.size)
+                if len(header) < RECORD.size:
+                    break
+                timestamp, conn_id, event, source, length = RECORD.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    logger.warning(f"Truncated record at end of {path}")
+                    break
+                yield timestamp, conn_id, event, SOURCE_NAMES.get(source, 'unknown'), payload
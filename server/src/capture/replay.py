@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Replay a raw ingest capture into running TAP / Serial over IP listeners.
+
+Usage:
+    python -m src.capture.replay data/capture/ingest.cap [--speed N] [--host H]
+                                 [--tap-port P] [--serial-ip-port P]
+
+--speed 1 replays at the original pace, --speed 10 ten times faster and
+--speed 0 as fast as possible. Rotated backups (ingest.cap.1, ...) are
+replayed first, oldest to newest.
+"""
+
+import argparse
+import logging
+import socket
+import sys
+import threading
+import time
+
+from src.capture.recorder import (EVENT_OPEN, EVENT_DATA, EVENT_CLOSE, EVENT_SESSION, capture_files,
+                                  read_capture)
+
+logger = logging.getLogger(__name__)
+
+def _drain(sock):
+    """Discard whatever the server sends back (TAP ACKs) so it never blocks on send"""
+    try:
+        while sock.recv(4096):
+            pass
+    except OSError:
+        pass
+
+class _Connection:
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+        self.reader = threading.Thread(target=_drain, args=(self.sock,), daemon=True)
+        self.reader.start()
+
+    def send(self, payload):
+        self.sock.sendall(payload)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        self.reader.join(timeout=5)
+        self.sock.close()
+
+def replay(paths, ports, host='localhost', speed=1.0):
+    """Feed capture records to the listeners; returns replay statistics.
+
+    A connection the listener refuses or drops (allow-list, capacity, buffer
+    limit) is abandoned and its remaining records counted as skipped. A session
+    record (the server restarted or its settings were saved) closes every
+    connection still open, since connection IDs start over after it.
+    """
+    connections = {}
+    stats = {'connections': 0, 'chunks': 0, 'bytes': 0, 'skipped': 0}
+    first_ts = session_start = None
+    start = time.perf_counter()
+
+    for timestamp, conn_id, event, source, payload in read_capture(paths):
+        if speed > 0:
+            if first_ts is None:
+                first_ts, session_start = timestamp, time.perf_counter()
+            delay = (timestamp - first_ts) / speed - (time.perf_counter() - session_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        if event == EVENT_OPEN:
+            if conn_id in connections:
+                connections.pop(conn_id).close()
+            port = ports.get(source)
+            if port is None:
+                stats['skipped'] += 1
+                continue
+            try:
+                connections[conn_id] = _Connection(host, port)
+            except OSError as e:
+                logger.warning(f"Capture connection {conn_id}: cannot connect to port {port}: {e}")
+                stats['skipped'] += 1
+                continue
+            stats['connections'] += 1
+        elif event == EVENT_DATA:
+            connection = connections.get(conn_id)
+            if connection is None:
+                stats['skipped'] += 1
+                continue
+            try:
+                connection.send(payload)
+            except OSError as e:
+                logger.warning(f"Capture connection {conn_id} dropped by the listener: {e}")
+                connections.pop(conn_id).close()
+                stats['skipped'] += 1
+                continue
+            stats['chunks'] += 1
+            stats['bytes'] += len(payload)
+        elif event == EVENT_CLOSE and conn_id in connections:
+            connections.pop(conn_id).close()
+        elif event == EVENT_SESSION:
+            for connection in connections.values():
+                connection.close()
+            connections = {}
+            # Pace each session from its own start, skipping the gap while the server was down
+            first_ts = None
+
+    for connection in connections.values():
+        connection.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a raw ingest capture')
+    parser.add_argument('capture', help='Capture file (rotated backups are included)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Playback speed multiplier, 0 for as fast as possible')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--tap-port', type=int, default=18001)
+    parser.add_argument('--serial-ip-port', type=int, default=5001)
+    args = parser.parse_args(argv)
+
+    paths = capture_files(args.capture)
+    if not paths:
+        print(f"[ERROR] No capture found at {args.capture}")
+        return 1
+
+    ports = {'tap': args.tap_port, 'serial_ip': args.serial_ip_port}
+    stats = replay(paths, ports, host=args.host, speed=args.speed)
+    print(f"[OK] Replayed {stats['chunks']} chunks ({stats['bytes']} bytes) over "
+          f"{stats['connections']} connection(s) in {stats['seconds']:.2f}s")
+    if stats['skipped']:
+        print(f"  Skipped {stats['skipped']} record(s): no target port, or the connection "
+              f"was refused or dropped by the listener")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
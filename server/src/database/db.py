@@ -1,14 +1,229 @@
 import sqlite3
 import os
+import threading
 import bcrypt
-from datetime import datetime
+from datetime import datetime, timezone
+from src.database.recent import AlarmRecord, RecentAlarms
+
+# Structured fields extracted by src.parsers at ingest time
+ALARM_FIELDS = ('event_type', 'point', 'zone', 'panel', 'pager_id', 'event_time')
+
+def _migrate_v1(cursor):
+    """Baseline schema; idempotent so unversioned databases upgrade cleanly"""
+    # Users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Settings table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            description TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Alarms table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alarms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            message TEXT NOT NULL,
+            raw_data TEXT,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            processed BOOLEAN DEFAULT 0,
+            sent_to_app BOOLEAN DEFAULT 0,
+            event_type TEXT,
+            point TEXT,
+            zone TEXT,
+            panel TEXT,
+            pager_id TEXT,
+            event_time TEXT
+        )
+    ''')
+
+    # Add parsed field columns to databases created before parsing existed
+    cursor.execute('PRAGMA table_info(alarms)')
+    existing = {row['name'] for row in cursor.fetchall()}
+    for field in ALARM_FIELDS:
+        if field not in existing:
+            cursor.execute(f'ALTER TABLE alarms ADD COLUMN {field} TEXT')
+    for field in ('event_type', 'zone', 'point'):
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_alarms_{field} ON alarms ({field})')
+
+    # Alarm rules table for future expansion
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alarm_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            enabled BOOLEAN DEFAULT 1,
+            conditions TEXT,
+            actions TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # API tokens issued to phone apps
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS api_tokens (
+            id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            device TEXT,
+            issued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at INTEGER NOT NULL,
+            revoked BOOLEAN DEFAULT 0
+        )
+    ''')
+
+    # Outbound notification queue (rows are deleted once delivered)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target TEXT NOT NULL,
+            alarm_id INTEGER,
+            payload TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notification_queue_status
+        ON notification_queue (status, next_attempt_at)
+    ''')
+
+    # Insert default admin user if not exists
+    cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('admin',))
+    if cursor.fetchone()[0] == 0:
+        hashed_password = bcrypt.hashpw('admin'.encode('utf-8'), bcrypt.gensalt())
+        cursor.execute('INSERT INTO users (username, password) VALUES (?, ?)',
+                     ('admin', hashed_password.decode('utf-8')))
+        print("Created default admin user (admin/admin)")
+
+    # Insert default settings if not exists
+    default_settings = [
+        ('serial_enabled', 'false', 'Enable serial port monitoring'),
+        ('serial_port', '/dev/ttyUSB0', 'Serial port device path'),
+        ('serial_baud_rate', '9600', 'Serial port baud rate'),
+        ('tap_enabled', 'true', 'Enable TAP over IP'),
+        ('tap_port', '18001', 'TAP over IP port'),
+        ('tap_host', 'localhost', 'TAP over IP bind address'),
+        ('serial_ip_enabled', 'true', 'Enable Serial over IP'),
+        ('serial_ip_port', '5001', 'Serial over IP port'),
+        ('serial_ip_host', 'localhost', 'Serial over IP bind address'),
+        ('conn_max_connections', '10', 'Max concurrent TCP clients per listener (0 = unlimited)'),
+        ('conn_rate_limit', '20', 'Max messages per second per TCP client (0 = unlimited)'),
+        ('conn_rate_burst', '50', 'Message burst allowed per TCP client'),
+        ('conn_max_buffer_bytes', '65536', 'Max undelimited bytes buffered per TCP client'),
+        ('conn_idle_timeout', '0', 'Seconds before an idle TCP client is dropped (0 = never)'),
+        ('conn_allowed_ips', '', 'Comma-separated source IPs allowed to connect (empty = all)'),
+        ('serial_parser', 'fire_panel', 'Message parser for the serial port'),
+        ('tap_parser', 'tap', 'Message parser for TAP over IP'),
+        ('serial_ip_parser', 'fire_panel', 'Message parser for Serial over IP'),
+        ('parser_regex', '', 'Regex with named groups used by the regex parser'),
+        ('api_auth_enabled', 'false', 'Require API tokens for /api/* and the /app socket'),
+        ('api_token_ttl_days', '30', 'Days before an issued API token expires'),
+        ('notification_targets', '[]', 'JSON list of outbound notification targets'),
+        ('notification_max_attempts', '8', 'Delivery attempts before a notification is marked failed'),
+    ]
+
+    for key, value, description in default_settings:
+        cursor.execute('INSERT OR IGNORE INTO settings (key, value, description) VALUES (?, ?, ?)',
+                     (key, value, description))
+
+def _migrate_v2(cursor):
+    """Raw ingest capture settings"""
+    default_settings = [
+        ('capture_enabled', 'false', 'Record raw inbound TCP bytes for replay'),
+        ('capture_path', 'data/capture/ingest.cap', 'Capture file path'),
+        ('capture_max_bytes', '10485760', 'Rotate the capture file at this size'),
+        ('capture_backup_count', '5', 'Rotated capture files to keep'),
+    ]
+    for key, value, description in default_settings:
+        cursor.execute('INSERT OR IGNORE INTO settings (key, value, description) VALUES (?, ?, ?)',
+                       (key, value, description))
+
+def _add_column(cursor, table, column, definition):
+    """ALTER TABLE ADD COLUMN, skipped when the column already exists"""
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _migrate_v3(cursor):
+    """Multi-site replication: origin tagging and pull checkpoints"""
+    _add_column(cursor, 'alarms', 'origin_site', 'TEXT')
+    _add_column(cursor, 'alarms', 'origin_id', 'INTEGER')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_alarms_origin
+        ON alarms (origin_site, origin_id) WHERE origin_site IS NOT NULL
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS replication_checkpoints (
+            peer TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    default_settings = [
+        ('site_name', '', 'Name of this site in replication feeds (defaults to hostname)'),
+        ('replication_peers', '[]', 'JSON list of remote sites to pull alarms from'),
+        ('replication_batch_size', '500', 'Alarms fetched per replication request'),
+    ]
+    for key, value, description in default_settings:
+        cursor.execute('INSERT OR IGNORE INTO settings (key, value, description) VALUES (?, ?, ?)',
+                       (key, value, description))
+
+def _migrate_v4(cursor):
+    """Index for the newest-first alarm lists when they fall back to the table"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_alarms_received ON alarms (received_at, id)')
+
+def _migrate_v5(cursor):
+    """Deadline for TCP clients to finish a message they have started"""
+    cursor.execute('INSERT OR IGNORE INTO settings (key, value, description) VALUES (?, ?, ?)',
+                   ('conn_message_timeout', '60',
+                    'Seconds a TCP client may take to finish a started message (0 = never)'))
+
+def _migrate_v6(cursor):
+    """Stop dropping quiet panels: idle timeout off unless it was changed from the old 300s default"""
+    cursor.execute("UPDATE settings SET value = '0' WHERE key = 'conn_idle_timeout' AND value = '300'")
+
+# Schema migrations in order; PRAGMA user_version records how many have run.
+# Append new migrations here rather than editing earlier ones.
+MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
 
 class Database:
-    def __init__(self, db_path='data/appear.db'):
+    # Paths whose schema has already been checked in this process
+    _checked = set()
+    _lock = threading.Lock()
+    # In-memory window of the newest alarms per path, serving the hot alarm lists
+    _recent = {}
+    RECENT_CAPACITY = 500
+
+    def __init__(self, db_path=None):
+        db_path = db_path or os.getenv('DB_PATH', 'data/appear.db')
         # Ensure data directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
         self.db_path = db_path
         self.init_db()
+        with Database._lock:
+            self.recent = Database._recent.setdefault(db_path, RecentAlarms(self.RECENT_CAPACITY))
 
     def get_connection(self):
         conn = sqlite3.connect(self.db_path)
@@ -16,83 +231,22 @@ class Database:
         return conn
 
     def init_db(self):
-        """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Apply pending schema migrations; a single PRAGMA read once current"""
+        with Database._lock:
+            if self.db_path in Database._checked:
+                return
 
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Settings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                description TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Alarms table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alarms (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source TEXT NOT NULL,
-                message TEXT NOT NULL,
-                raw_data TEXT,
-                received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                processed BOOLEAN DEFAULT 0,
-                sent_to_app BOOLEAN DEFAULT 0
-            )
-        ''')
-
-        # Alarm rules table for future expansion
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alarm_rules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                enabled BOOLEAN DEFAULT 1,
-                conditions TEXT,
-                actions TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Insert default admin user if not exists
-        cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('admin',))
-        if cursor.fetchone()[0] == 0:
-            hashed_password = bcrypt.hashpw('admin'.encode('utf-8'), bcrypt.gensalt())
-            cursor.execute('INSERT INTO users (username, password) VALUES (?, ?)',
-                         ('admin', hashed_password.decode('utf-8')))
-            print("Created default admin user (admin/admin)")
-
-        # Insert default settings if not exists
-        default_settings = [
-            ('serial_enabled', 'false', 'Enable serial port monitoring'),
-            ('serial_port', '/dev/ttyUSB0', 'Serial port device path'),
-            ('serial_baud_rate', '9600', 'Serial port baud rate'),
-            ('tap_enabled', 'true', 'Enable TAP over IP'),
-            ('tap_port', '18001', 'TAP over IP port'),
-            ('tap_host', 'localhost', 'TAP over IP bind address'),
-            ('serial_ip_enabled', 'true', 'Enable Serial over IP'),
-            ('serial_ip_port', '5001', 'Serial over IP port'),
-            ('serial_ip_host', 'localhost', 'Serial over IP bind address'),
-        ]
-
-        for key, value, description in default_settings:
-            cursor.execute('INSERT OR IGNORE INTO settings (key, value, description) VALUES (?, ?, ?)',
-                         (key, value, description))
-
-        conn.commit()
-        conn.close()
-        print(f"Database initialized at {self.db_path}")
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                    migration(cursor)
+                    cursor.execute(f'PRAGMA user_version = {target}')
+                conn.commit()
+                print(f"Database at {self.db_path} migrated to schema version {SCHEMA_VERSION}")
+            conn.close()
+            Database._checked.add(self.db_path)
 
     # User methods
     def get_user(self, username):
@@ -109,6 +263,35 @@ class Database:
             return bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8'))
         return False
 
+    # API token methods
+    def save_api_token(self, token_id, username, device, expires_at):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO api_tokens (id, username, device, expires_at)
+            VALUES (?, ?, ?, ?)
+        ''', (token_id, username, device, expires_at))
+        conn.commit()
+        conn.close()
+
+    def revoke_api_token(self, token_id):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('UPDATE api_tokens SET revoked = 1 WHERE id = ?', (token_id,))
+        conn.commit()
+        conn.close()
+
+    def get_revoked_token_ids(self):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM api_tokens
+            WHERE revoked = 1 AND expires_at > CAST(strftime('%s', 'now') AS INTEGER)
+        ''')
+        token_ids = [row['id'] for row in cursor.fetchall()]
+        conn.close()
+        return token_ids
+
     # Settings methods
     def get_setting(self, key, default=None):
         conn = self.get_connection()
@@ -138,16 +321,24 @@ class Database:
         conn.close()
 
     # Alarm methods
-    def save_alarm(self, source, message, raw_data=None):
+    def save_alarm(self, source, message, raw_data=None, fields=None):
+        fields = fields or {}
+        # Same format and clock as CURRENT_TIMESTAMP, so the recent window sorts like the table
+        received_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        values = [fields.get(field) for field in ALARM_FIELDS]
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO alarms (source, message, raw_data, received_at)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (source, message, raw_data))
+            INSERT INTO alarms (source, message, raw_data, received_at,
+                                event_type, point, zone, panel, pager_id, event_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (source, message, raw_data, received_at, *values))
         alarm_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self.recent.add(AlarmRecord(id=alarm_id, source=source, message=message, raw_data=raw_data,
+                                    received_at=received_at, processed=0, sent_to_app=0,
+                                    **dict(zip(ALARM_FIELDS, values))))
         return alarm_id
 
     def mark_alarm_sent(self, alarm_id):
@@ -156,19 +347,100 @@ class Database:
         cursor.execute('UPDATE alarms SET sent_to_app = 1 WHERE id = ?', (alarm_id,))
         conn.commit()
         conn.close()
+        self.recent.update(alarm_id, sent_to_app=1)
 
-    def get_recent_alarms(self, limit=100):
+    def _fetch_recent_alarms(self, limit):
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT * FROM alarms
-            ORDER BY received_at DESC
+            ORDER BY received_at DESC, id DESC
             LIMIT ?
         ''', (limit,))
         alarms = cursor.fetchall()
         conn.close()
         return alarms
 
+    def warm_recent_alarms(self):
+        """Load the newest alarms into the shared in-memory window"""
+        self.recent.warm(self._fetch_recent_alarms)
+
+    def _recent_records(self, limit):
+        """Newest alarms from the in-memory window, or None when only the table can answer"""
+        if not self.recent.warmed:
+            self.warm_recent_alarms()
+        return self.recent.latest(limit)
+
+    def get_recent_alarms(self, limit=100):
+        alarms = self._recent_records(limit)
+        if alarms is None:
+            alarms = self._fetch_recent_alarms(limit)
+        return alarms
+
+    def get_recent_alarms_json(self, limit=100):
+        """Newest alarms as a JSON array, joined from per-alarm cached fragments"""
+        alarms = self._recent_records(limit)
+        if alarms is None:
+            alarms = [AlarmRecord.from_row(row) for row in self._fetch_recent_alarms(limit)]
+        return '[' + ','.join(alarm.to_json() for alarm in alarms) + ']'
+
+    # Replication methods
+    def get_local_alarms_since(self, since_id, limit=500):
+        """Alarms received by this site (not replicated ones) with id > since_id, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, source, message, raw_data, received_at, {', '.join(ALARM_FIELDS)}
+            FROM alarms
+            WHERE id > ? AND origin_site IS NULL
+            ORDER BY id
+            LIMIT ?
+        ''', (since_id, limit))
+        alarms = cursor.fetchall()
+        conn.close()
+        return alarms
+
+    def save_replicated_alarms(self, peer, alarms):
+        """Insert alarms pulled from a peer and advance its checkpoint in one transaction.
+
+        Rows are tagged and deduplicated on the locally configured peer name, which is
+        unique here; the name a site reports for itself (often just its hostname) is not.
+        """
+        if not alarms:
+            return 0
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        before = conn.total_changes
+        cursor.executemany(f'''
+            INSERT OR IGNORE INTO alarms
+                (source, message, raw_data, received_at, origin_site, origin_id, {', '.join(ALARM_FIELDS)})
+            VALUES (?, ?, ?, ?, ?, ?, {', '.join('?' for _ in ALARM_FIELDS)})
+        ''', [
+            (alarm.get('source', 'unknown'), alarm.get('message', ''), alarm.get('raw_data'),
+             alarm.get('received_at'), peer, alarm['id'], *(alarm.get(field) for field in ALARM_FIELDS))
+            for alarm in alarms
+        ])
+        inserted = conn.total_changes - before
+        cursor.execute('''
+            INSERT INTO replication_checkpoints (peer, last_id, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(peer) DO UPDATE SET last_id = excluded.last_id, updated_at = CURRENT_TIMESTAMP
+        ''', (peer, max(alarm['id'] for alarm in alarms)))
+        conn.commit()
+        conn.close()
+        # Replicated alarms keep their original times and may land mid-window; reload it
+        if inserted and self.recent.warmed:
+            self.warm_recent_alarms()
+        return inserted
+
+    def get_replication_checkpoint(self, peer):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT last_id FROM replication_checkpoints WHERE peer = ?', (peer,))
+        result = cursor.fetchone()
+        conn.close()
+        return result['last_id'] if result else 0
+
     def get_alarm_stats(self):
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -182,3 +454,60 @@ class Database:
         stats = cursor.fetchone()
         conn.close()
         return dict(stats) if stats else {'total': 0, 'sent': 0, 'sources': 0}
+
+    # Notification queue methods
+    def enqueue_notifications(self, alarm_id, payload, targets):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        queue_ids = {}
+        for target in targets:
+            cursor.execute('''
+                INSERT INTO notification_queue (target, alarm_id, payload)
+                VALUES (?, ?, ?)
+            ''', (target, alarm_id, payload))
+            queue_ids[target] = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return queue_ids
+
+    def get_pending_notifications(self):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM notification_queue WHERE status = 'pending' ORDER BY id")
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def claim_due_notifications(self, now):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM notification_queue
+            WHERE status = 'retry' AND next_attempt_at <= ?
+            ORDER BY id
+        ''', (now,))
+        rows = cursor.fetchall()
+        if rows:
+            cursor.executemany("UPDATE notification_queue SET status = 'pending' WHERE id = ?",
+                               [(row['id'],) for row in rows])
+            conn.commit()
+        conn.close()
+        return rows
+
+    def update_notification(self, queue_id, status, attempts, next_attempt_at, last_error):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE notification_queue
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+            WHERE id = ?
+        ''', (status, attempts, next_attempt_at, last_error, queue_id))
+        conn.commit()
+        conn.close()
+
+    def delete_notifications(self, queue_ids):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('DELETE FROM notification_queue WHERE id = ?', [(i,) for i in queue_ids])
+        conn.commit()
+        conn.close()
@@ -0,0 +1,107 @@
+import json
+import threading
+from collections import deque
+from itertools import islice
+
+# Columns of the alarms table, in SELECT * order
+COLUMNS = ('id', 'source', 'message', 'raw_data', 'received_at', 'processed', 'sent_to_app',
+           'event_type', 'point', 'zone', 'panel', 'pager_id', 'event_time', 'origin_site', 'origin_id')
+
+class AlarmRecord:
+    """Compact alarm row that reads like sqlite3.Row (attributes, keys, dict()).
+
+    Treated as immutable once built: changes go through replace(), so a cached
+    JSON fragment never goes stale under a concurrent reader.
+    """
+    __slots__ = COLUMNS + ('_json',)
+
+    def __init__(self, **values):
+        for column in COLUMNS:
+            setattr(self, column, values.get(column))
+        self._json = None
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(**dict(zip(row.keys(), row)))
+
+    def replace(self, **changes):
+        values = {column: getattr(self, column) for column in COLUMNS}
+        values.update(changes)
+        return AlarmRecord(**values)
+
+    def keys(self):
+        return COLUMNS
+
+    def __getitem__(self, key):
+        if key not in COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def sort_key(self):
+        # Same order as the alarm lists: received_at, then id for ties
+        return (self.received_at or '', self.id)
+
+    def to_json(self):
+        """JSON object for this alarm, serialized once and cached"""
+        if self._json is None:
+            values = {column: getattr(self, column) for column in COLUMNS}
+            self._json = json.dumps(values, sort_keys=True, separators=(',', ':'))
+        return self._json
+
+class RecentAlarms:
+    """Bounded window of the newest alarms, oldest first, shared by all Database objects on a path"""
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.records = deque()
+        self.by_id = {}
+        self.warmed = False
+        # True while the window holds every alarm in the database
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def warm(self, fetch):
+        """Replace the window with fetch(capacity): the newest rows, newest first"""
+        with self.lock:
+            rows = fetch(self.capacity)
+            self.records = deque(AlarmRecord.from_row(row) for row in reversed(rows))
+            self.by_id = {record.id: record for record in self.records}
+            self.complete = len(rows) < self.capacity
+            self.warmed = True
+
+    def add(self, record):
+        with self.lock:
+            if not self.warmed or record.id in self.by_id:
+                return
+            key = record.sort_key()
+            if len(self.records) >= self.capacity and key < self.records[0].sort_key():
+                self.complete = False
+                return
+
+            # Live alarms are the newest and land at the end straight away
+            index = len(self.records)
+            while index and self.records[index - 1].sort_key() > key:
+                index -= 1
+            self.records.insert(index, record)
+            self.by_id[record.id] = record
+
+            if len(self.records) > self.capacity:
+                evicted = self.records.popleft()
+                del self.by_id[evicted.id]
+                self.complete = False
+
+    def update(self, alarm_id, **changes):
+        with self.lock:
+            record = self.by_id.get(alarm_id)
+            if record is None:
+                return
+            updated = record.replace(**changes)
+            self.records[self.records.index(record)] = updated
+            self.by_id[alarm_id] = updated
+
+    def latest(self, limit):
+        """Up to `limit` newest records, newest first, or None if the window cannot answer"""
+        with self.lock:
+            if not self.warmed or limit < 0 or (limit > len(self.records) and not self.complete):
+                return None
+            return list(islice(reversed(self.records), limit))
@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Per-connection message rate limiter"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def consume(self):
+        """Take one token, returning the number of seconds the caller must wait first"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+class ConnectionLimiter:
+    """Admission control and throttling shared by the TCP alarm listeners"""
+
+    COUNTERS = ('accepted', 'rejected_capacity', 'rejected_ip', 'throttled',
+                'buffer_overflows', 'idle_timeouts', 'message_timeouts')
+
+    def __init__(self, max_connections=10, rate=20, burst=50, max_buffer_bytes=65536,
+                 idle_timeout=0, message_timeout=60, allowed_ips=None):
+        self.max_connections = int(max_connections)
+        self.rate = float(rate)
+        self.burst = int(burst)
+        self.max_buffer_bytes = int(max_buffer_bytes)
+        self.idle_timeout = float(idle_timeout)
+        self.message_timeout = float(message_timeout)
+        self.allowed_ips = set(allowed_ips or [])
+        self.active = 0
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.lock = threading.Lock()
+
+    # (setting, constructor argument, default, type)
+    SETTINGS = (
+        ('conn_max_connections', 'max_connections', 10, int),
+        ('conn_rate_limit', 'rate', 20, float),
+        ('conn_rate_burst', 'burst', 50, int),
+        ('conn_max_buffer_bytes', 'max_buffer_bytes', 65536, int),
+        ('conn_idle_timeout', 'idle_timeout', 0, float),
+        ('conn_message_timeout', 'message_timeout', 60, float),
+    )
+
+    @classmethod
+    def from_settings(cls, db):
+        """Build a limiter from the conn_* settings, using the default for any invalid value"""
+        options = {}
+        for key, option, default, kind in cls.SETTINGS:
+            value = db.get_setting(key, str(default))
+            try:
+                number = float(value)
+                if not math.isfinite(number) or number < 0:
+                    raise ValueError('must be a non-negative number')
+                parsed = kind(number)
+            except (TypeError, ValueError, OverflowError):
+                # A cleared field must not keep the alarm listeners from starting
+                logger.warning(f"Invalid {key} {value!r}, using {default}")
+                parsed = default
+            options[option] = parsed
+        allowed = db.get_setting('conn_allowed_ips', '') or ''
+        options['allowed_ips'] = [ip.strip() for ip in allowed.split(',') if ip.strip()]
+        return cls(**options)
+
+    def admit(self, client_address):
+        """Decide whether a newly accepted client may stay connected"""
+        with self.lock:
+            if self.allowed_ips and client_address[0] not in self.allowed_ips:
+                self.counters['rejected_ip'] += 1
+                logger.warning("Rejected connection from %s: not in allow-list", client_address)
+                return False
+            if self.max_connections > 0 and self.active >= self.max_connections:
+                self.counters['rejected_capacity'] += 1
+                logger.warning("Rejected connection from %s: %d connections already open",
+                               client_address, self.active)
+                return False
+            self.active += 1
+            self.counters['accepted'] += 1
+            return True
+
+    def release(self):
+        """Free the slot held by a disconnected client"""
+        with self.lock:
+            self.active = max(0, self.active - 1)
+
+    def record(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def new_bucket(self):
+        return TokenBucket(self.rate, self.burst)
+
+    def throttle(self, bucket):
+        """Block the client thread until its bucket allows another message"""
+        delay = bucket.consume()
+        if delay > 0:
+            self.record('throttled')
+            time.sleep(delay)
+
+    def socket_timeout(self, pending_since=None):
+        """Timeout for the next recv: the idle timeout, cut short by a partial message's deadline"""
+        timeout = self.idle_timeout if self.idle_timeout > 0 else None
+        if self.message_timeout > 0 and pending_since is not None:
+            remaining = max(0.01, self.message_timeout - (time.monotonic() - pending_since))
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def message_expired(self, pending_since):
+        """True when a partial message has been trickling in for longer than message_timeout"""
+        return (self.message_timeout > 0 and pending_since is not None
+                and time.monotonic() - pending_since >= self.message_timeout)
+
+    def buffer_exceeded(self, buffer):
+        return self.max_buffer_bytes > 0 and len(buffer) > self.max_buffer_bytes
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['active'] = self.active
+            stats['max_connections'] = self.max_connections
+        return stats
@@ -3,11 +3,12 @@ import threading
 import time
 import logging
 from src.database.db import Database
+from src.parsers.registry import create_parser
 
 logger = logging.getLogger(__name__)
 
 class SerialHandler:
-    def __init__(self, port, baud_rate, alarm_callback=None):
+    def __init__(self, port, baud_rate, alarm_callback=None, parser=None):
         self.port = port
         self.baud_rate = int(baud_rate)
         self.alarm_callback = alarm_callback
@@ -15,6 +16,12 @@ class SerialHandler:
         self.running = False
         self.thread = None
         self.db = Database()
+        self.parser = parser or create_parser('fire_panel')
+        # Liveness, read by the handler supervisor
+        self.started_at = None
+        self.last_heartbeat = None
+        self.last_message_at = None
+        self.last_error = None
 
     def start(self):
         """Start serial port monitoring"""
@@ -23,6 +30,8 @@ class SerialHandler:
             return
 
         self.running = True
+        self.started_at = self.last_heartbeat = time.time()
+        self.last_error = None
         self.thread = threading.Thread(target=self._monitor_serial, daemon=True)
         self.thread.start()
         logger.info(f"Serial handler started on {self.port} at {self.baud_rate} baud")
@@ -39,6 +48,7 @@ class SerialHandler:
     def _monitor_serial(self):
         """Monitor serial port for incoming data"""
         while self.running:
+            self.last_heartbeat = time.time()
             try:
                 if not self.serial_conn or not self.serial_conn.is_open:
                     self.serial_conn = serial.Serial(
@@ -54,6 +64,7 @@ class SerialHandler:
                         self._process_alarm(raw_data)
 
             except serial.SerialException as e:
+                self.last_error = str(e)
                 logger.error(f"Serial port error: {e}")
                 if self.serial_conn and self.serial_conn.is_open:
                     self.serial_conn.close()
@@ -66,26 +77,34 @@ class SerialHandler:
     def _process_alarm(self, raw_data):
         """Process received alarm data"""
         try:
-            # Save to database
+            # Parse and save to database
+            fields = self.parser.parse(raw_data)
+            message = fields.pop('message')
             alarm_id = self.db.save_alarm(
                 source='serial',
-                message=raw_data,
-                raw_data=raw_data
+                message=message,
+                raw_data=raw_data,
+                fields=fields
             )
+            self.last_message_at = time.time()
 
-            logger.info(f"Received alarm from serial: {raw_data[:100]}")
+            logger.info("Received alarm from serial: %.100s", message)
 
             # Call callback if registered (for real-time notification)
             if self.alarm_callback:
                 self.alarm_callback({
                     'id': alarm_id,
                     'source': 'serial',
-                    'message': raw_data,
-                    'raw_data': raw_data
+                    'message': message,
+                    'raw_data': raw_data,
+                    **fields
                 })
 
         except Exception as e:
-            logger.error(f"Error processing alarm: {e}", exc_info=True)
+            logger.error("Error processing alarm: %s", e, exc_info=True)
+
+    def live_connections(self):
+        return 1 if self.serial_conn and self.serial_conn.is_open else 0
 
     def is_running(self):
         return self.running and self.thread and self.thread.is_alive()
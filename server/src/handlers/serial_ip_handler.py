@@ -1,14 +1,18 @@
 import socket
 import threading
+import time
 import logging
 from src.database.db import Database
+from src.parsers.registry import create_parser
+from src.handlers.connection_limiter import ConnectionLimiter
 
 logger = logging.getLogger(__name__)
 
 class SerialIPHandler:
     """Handler for Serial over IP (TCP serial server)"""
 
-    def __init__(self, host, port, alarm_callback=None):
+    def __init__(self, host, port, alarm_callback=None, limiter=None, parser=None,
+                 capture=None):
         self.host = host
         self.port = int(port)
         self.alarm_callback = alarm_callback
@@ -16,7 +20,15 @@ class SerialIPHandler:
         self.running = False
         self.thread = None
         self.db = Database()
+        self.parser = parser or create_parser('fire_panel')
         self.client_threads = []
+        self.limiter = limiter or ConnectionLimiter()
+        self.capture = capture
+        # Liveness, read by the handler supervisor
+        self.started_at = None
+        self.last_heartbeat = None
+        self.last_message_at = None
+        self.last_error = None
 
     def start(self):
         """Start Serial over IP server"""
@@ -25,6 +37,8 @@ class SerialIPHandler:
             return
 
         self.running = True
+        self.started_at = self.last_heartbeat = time.time()
+        self.last_error = None
         self.thread = threading.Thread(target=self._run_server, daemon=True)
         self.thread.start()
         logger.info(f"Serial over IP handler started on {self.host}:{self.port}")
@@ -50,9 +64,14 @@ class SerialIPHandler:
             logger.info(f"Serial over IP server listening on {self.host}:{self.port}")
 
             while self.running:
+                self.last_heartbeat = time.time()
+                self._reap_clients()
                 try:
                     client_socket, client_address = self.server_socket.accept()
-                    logger.info(f"Serial over IP client connected from {client_address}")
+                    if not self.limiter.admit(client_address):
+                        client_socket.close()
+                        continue
+                    logger.info("Serial over IP client connected from %s", client_address)
 
                     # Handle client in separate thread
                     client_thread = threading.Thread(
@@ -67,9 +86,10 @@ class SerialIPHandler:
                     continue
                 except Exception as e:
                     if self.running:
-                        logger.error(f"Error accepting connection: {e}")
+                        logger.error("Error accepting connection: %s", e)
 
         except Exception as e:
+            self.last_error = str(e)
             logger.error(f"Error in Serial over IP server: {e}", exc_info=True)
         finally:
             if self.server_socket:
@@ -77,63 +97,118 @@ class SerialIPHandler:
 
     def _handle_client(self, client_socket, client_address):
         """Handle individual Serial over IP client connection"""
+        bucket = self.limiter.new_bucket()
+        conn_id = self.capture.open('serial_ip', client_address) if self.capture else None
         try:
             buffer = ""
+            # When the partial line in the buffer started arriving
+            pending_since = None
 
             while self.running:
-                data = client_socket.recv(4096)
+                client_socket.settimeout(self.limiter.socket_timeout(pending_since))
+                try:
+                    data = client_socket.recv(4096)
+                except socket.timeout:
+                    if self.limiter.message_expired(pending_since):
+                        self.limiter.record('message_timeouts')
+                        logger.warning("Serial over IP client %s did not complete a line in time, disconnecting",
+                                       client_address)
+                        buffer = ""
+                    else:
+                        self.limiter.record('idle_timeouts')
+                        logger.warning("Serial over IP client %s idle timeout", client_address)
+                    break
                 if not data:
                     break
+                if self.capture:
+                    self.capture.data(conn_id, 'serial_ip', data)
 
                 # Decode and process line by line
                 received = data.decode('utf-8', errors='ignore')
                 buffer += received
 
-                # Log received data for debugging
-                logger.info(f"Received {len(data)} bytes from {client_address}: {repr(received[:100])}")
+                # Log received data for debugging (formatted only when DEBUG is enabled)
+                logger.debug("Received %d bytes from %s: %r", len(data), client_address, received[:100])
 
                 # Process complete lines (newline-delimited)
+                completed = False
                 while '\n' in buffer:
                     line, buffer = buffer.split('\n', 1)
+                    completed = True
                     line = line.strip()
                     if line:
+                        self.limiter.throttle(bucket)
                         self._process_serial_message(line, client_address)
 
+                # Drop clients that never send a newline
+                if self.limiter.buffer_exceeded(buffer):
+                    self.limiter.record('buffer_overflows')
+                    logger.warning("Serial over IP client %s exceeded buffer limit, disconnecting", client_address)
+                    buffer = ""
+                    break
+
+                # Clients trickling a line byte by byte must still finish it in time
+                if not buffer.strip():
+                    pending_since = None
+                elif completed or pending_since is None:
+                    pending_since = time.monotonic()
+                elif self.limiter.message_expired(pending_since):
+                    self.limiter.record('message_timeouts')
+                    logger.warning("Serial over IP client %s did not complete a line in time, disconnecting",
+                                   client_address)
+                    buffer = ""
+                    break
+
             # Process any remaining data in buffer when connection closes
             if buffer.strip():
-                logger.info(f"Processing remaining buffer from {client_address}: {repr(buffer[:100])}")
+                logger.debug("Processing remaining buffer from %s: %r", client_address, buffer[:100])
                 self._process_serial_message(buffer.strip(), client_address)
 
         except Exception as e:
-            logger.error(f"Error handling Serial over IP client {client_address}: {e}")
+            logger.error("Error handling Serial over IP client %s: %s", client_address, e)
         finally:
             client_socket.close()
-            logger.info(f"Serial over IP client {client_address} disconnected")
+            self.limiter.release()
+            if self.capture:
+                self.capture.close(conn_id, 'serial_ip')
+            logger.info("Serial over IP client %s disconnected", client_address)
 
     def _process_serial_message(self, message, client_address):
         """Process serial message received over IP"""
         try:
-            # Save to database
+            # Parse and save to database
+            fields = self.parser.parse(message)
+            text = fields.pop('message')
             alarm_id = self.db.save_alarm(
                 source='serial_ip',
-                message=message,
-                raw_data=f"From {client_address}: {message}"
+                message=text,
+                raw_data=f"From {client_address}: {message}",
+                fields=fields
             )
+            self.last_message_at = time.time()
 
-            logger.info(f"Received alarm from Serial over IP ({client_address}): {message[:100]}")
+            logger.info("Received alarm from Serial over IP (%s): %.100s", client_address, text)
 
             # Call callback if registered
             if self.alarm_callback:
                 self.alarm_callback({
                     'id': alarm_id,
                     'source': 'serial_ip',
-                    'message': message,
+                    'message': text,
                     'raw_data': f"From {client_address}: {message}",
-                    'client_address': str(client_address)
+                    'client_address': str(client_address),
+                    **fields
                 })
 
         except Exception as e:
-            logger.error(f"Error processing Serial over IP message: {e}", exc_info=True)
+            logger.error("Error processing Serial over IP message: %s", e, exc_info=True)
+
+    def _reap_clients(self):
+        """Forget client threads that have finished"""
+        self.client_threads = [thread for thread in self.client_threads if thread.is_alive()]
+
+    def live_connections(self):
+        return sum(1 for thread in self.client_threads if thread.is_alive())
 
     def is_running(self):
         return self.running and self.thread and self.thread.is_alive()
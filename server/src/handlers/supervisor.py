@@ -0,0 +1,135 @@
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HandlerSupervisor:
+    """Watches handler threads, restarts dead listeners with backoff and reports their health"""
+
+    def __init__(self, interval=1.0, stall_after=15.0, min_backoff=1.0, max_backoff=60.0):
+        self.interval = float(interval)
+        self.stall_after = float(stall_after)
+        self.min_backoff = float(min_backoff)
+        self.max_backoff = float(max_backoff)
+        self.handlers = {}
+        self.state = {}
+        # Enabled sources whose handler could not be built or started: {name: error}
+        self.failures = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def watch(self, name, handler):
+        with self.lock:
+            self.handlers[name] = handler
+            self.state[name] = {'restarts': 0, 'backoff': self.min_backoff, 'next_restart': 0,
+                                'last_restart': None, 'stalled': False}
+
+    def record_failure(self, name, error):
+        """Report an enabled source whose handler failed to start, so health shows it as failed"""
+        with self.lock:
+            self.failures[name] = str(error)
+
+    def start(self):
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='handler-supervisor', daemon=True)
+        self.thread.start()
+        logger.info(f"Handler supervisor watching {', '.join(self.handlers) or 'no handlers'}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                logger.error(f"Handler supervisor check failed: {e}", exc_info=True)
+
+    def check_once(self, now=None):
+        """Restart dead handlers whose backoff has elapsed and flag stalled ones"""
+        now = now or time.time()
+        with self.lock:
+            watched = list(self.handlers.items())
+
+        for name, handler in watched:
+            state = self.state[name]
+            if not handler.running:
+                # Stopped on purpose
+                continue
+
+            if handler.thread and handler.thread.is_alive():
+                stalled = now - (handler.last_heartbeat or now) > self.stall_after
+                if stalled and not state['stalled']:
+                    logger.warning(f"{name} handler stalled: no heartbeat for "
+                                   f"{now - handler.last_heartbeat:.1f}s")
+                elif state['stalled'] and not stalled:
+                    logger.info(f"{name} handler recovered from stall")
+                state['stalled'] = stalled
+                # Healthy long enough since the last restart: forget earlier failures
+                if state['last_restart'] and now - state['last_restart'] > self.max_backoff:
+                    state['backoff'] = self.min_backoff
+                continue
+
+            if now < state['next_restart']:
+                continue
+
+            logger.warning(f"{name} handler thread died ({handler.last_error or 'no error recorded'}); "
+                           f"restarting, next retry no sooner than {state['backoff']:.0f}s")
+            try:
+                handler.stop()
+                handler.start()
+            except Exception as e:
+                logger.error(f"Failed to restart {name} handler: {e}")
+            state['restarts'] += 1
+            state['last_restart'] = now
+            state['next_restart'] = now + state['backoff']
+            state['backoff'] = min(self.max_backoff, state['backoff'] * 2)
+
+    def get_health(self):
+        """Per-handler status, uptime, restarts, live connections and message age"""
+        now = time.time()
+        health = {}
+        with self.lock:
+            watched = list(self.handlers.items())
+            failures = dict(self.failures)
+
+        for name, error in failures.items():
+            health[name] = {
+                'status': 'failed',
+                'uptime': 0,
+                'restarts': 0,
+                'live_connections': 0,
+                'last_message_age': None,
+                'heartbeat_age': None,
+                'last_error': f"Failed to start: {error}"
+            }
+
+        for name, handler in watched:
+            state = self.state[name]
+            alive = bool(handler.thread and handler.thread.is_alive())
+            if not handler.running:
+                status = 'stopped'
+            elif not alive:
+                status = 'failed'
+            elif state['stalled']:
+                status = 'stalled'
+            else:
+                status = 'running'
+
+            health[name] = {
+                'status': status,
+                'uptime': round(now - handler.started_at, 1) if alive and handler.started_at else 0,
+                'restarts': state['restarts'],
+                'live_connections': handler.live_connections(),
+                'last_message_age': round(now - handler.last_message_at, 1) if handler.last_message_at else None,
+                'heartbeat_age': round(now - handler.last_heartbeat, 1) if handler.last_heartbeat else None,
+                'last_error': handler.last_error
+            }
+        return health
@@ -1,14 +1,18 @@
 import socket
 import threading
+import time
 import logging
 from src.database.db import Database
+from src.parsers.registry import create_parser
+from src.handlers.connection_limiter import ConnectionLimiter
 
 logger = logging.getLogger(__name__)
 
 class TAPHandler:
     """Handler for TAP (Telocator Alphanumeric Protocol) over IP"""
 
-    def __init__(self, host, port, alarm_callback=None):
+    def __init__(self, host, port, alarm_callback=None, limiter=None, parser=None,
+                 capture=None):
         self.host = host
         self.port = int(port)
         self.alarm_callback = alarm_callback
@@ -16,7 +20,15 @@ class TAPHandler:
         self.running = False
         self.thread = None
         self.db = Database()
+        self.parser = parser or create_parser('tap')
         self.client_threads = []
+        self.limiter = limiter or ConnectionLimiter()
+        self.capture = capture
+        # Liveness, read by the handler supervisor
+        self.started_at = None
+        self.last_heartbeat = None
+        self.last_message_at = None
+        self.last_error = None
 
     def start(self):
         """Start TAP server"""
@@ -25,6 +37,8 @@ class TAPHandler:
             return
 
         self.running = True
+        self.started_at = self.last_heartbeat = time.time()
+        self.last_error = None
         self.thread = threading.Thread(target=self._run_server, daemon=True)
         self.thread.start()
         logger.info(f"TAP handler started on {self.host}:{self.port}")
@@ -50,9 +64,14 @@ class TAPHandler:
             logger.info(f"TAP server listening on {self.host}:{self.port}")
 
             while self.running:
+                self.last_heartbeat = time.time()
+                self._reap_clients()
                 try:
                     client_socket, client_address = self.server_socket.accept()
-                    logger.info(f"TAP client connected from {client_address}")
+                    if not self.limiter.admit(client_address):
+                        client_socket.close()
+                        continue
+                    logger.info("TAP client connected from %s", client_address)
 
                     # Handle client in separate thread
                     client_thread = threading.Thread(
@@ -67,9 +86,10 @@ class TAPHandler:
                     continue
                 except Exception as e:
                     if self.running:
-                        logger.error(f"Error accepting connection: {e}")
+                        logger.error("Error accepting connection: %s", e)
 
         except Exception as e:
+            self.last_error = str(e)
             logger.error(f"Error in TAP server: {e}", exc_info=True)
         finally:
             if self.server_socket:
@@ -77,54 +97,105 @@ class TAPHandler:
 
     def _handle_client(self, client_socket, client_address):
         """Handle individual TAP client connection"""
+        bucket = self.limiter.new_bucket()
+        conn_id = self.capture.open('tap', client_address) if self.capture else None
         try:
             buffer = ""
+            # When the partial message in the buffer started arriving
+            pending_since = None
 
             while self.running:
-                data = client_socket.recv(4096)
+                client_socket.settimeout(self.limiter.socket_timeout(pending_since))
+                try:
+                    data = client_socket.recv(4096)
+                except socket.timeout:
+                    if self.limiter.message_expired(pending_since):
+                        self.limiter.record('message_timeouts')
+                        logger.warning("TAP client %s did not complete a message in time, disconnecting",
+                                       client_address)
+                    else:
+                        self.limiter.record('idle_timeouts')
+                        logger.warning("TAP client %s idle timeout", client_address)
+                    break
                 if not data:
                     break
+                if self.capture:
+                    self.capture.data(conn_id, 'tap', data)
 
                 buffer += data.decode('utf-8', errors='ignore')
 
                 # Process complete messages (TAP uses ESC EOT as message delimiter)
+                completed = False
                 while '\x1b\x04' in buffer:  # ESC EOT
                     message, buffer = buffer.split('\x1b\x04', 1)
+                    completed = True
                     if message.strip():
+                        self.limiter.throttle(bucket)
                         self._process_tap_message(message.strip())
                         # Send ACK
                         client_socket.send(b'\x06')  # ACK
 
+                # Drop clients that never send a delimiter
+                if self.limiter.buffer_exceeded(buffer):
+                    self.limiter.record('buffer_overflows')
+                    logger.warning("TAP client %s exceeded buffer limit, disconnecting", client_address)
+                    break
+
+                # Clients trickling a message byte by byte must still finish it in time
+                if not buffer.strip():
+                    pending_since = None
+                elif completed or pending_since is None:
+                    pending_since = time.monotonic()
+                elif self.limiter.message_expired(pending_since):
+                    self.limiter.record('message_timeouts')
+                    logger.warning("TAP client %s did not complete a message in time, disconnecting",
+                                   client_address)
+                    break
+
         except Exception as e:
-            logger.error(f"Error handling TAP client {client_address}: {e}")
+            logger.error("Error handling TAP client %s: %s", client_address, e)
         finally:
             client_socket.close()
-            logger.info(f"TAP client {client_address} disconnected")
+            self.limiter.release()
+            if self.capture:
+                self.capture.close(conn_id, 'tap')
+            logger.info("TAP client %s disconnected", client_address)
 
     def _process_tap_message(self, message):
         """Process TAP protocol message"""
         try:
-            # Parse TAP message (simplified - you may need more sophisticated parsing)
-            # TAP format typically includes pager ID and message
+            # Parse TAP block into pager ID, message text and panel fields
+            fields = self.parser.parse(message)
+            text = fields.pop('message')
             alarm_id = self.db.save_alarm(
                 source='tap',
-                message=message,
-                raw_data=message
+                message=text,
+                raw_data=message,
+                fields=fields
             )
+            self.last_message_at = time.time()
 
-            logger.info(f"Received alarm from TAP: {message[:100]}")
+            logger.info("Received alarm from TAP: %.100s", text)
 
             # Call callback if registered
             if self.alarm_callback:
                 self.alarm_callback({
                     'id': alarm_id,
                     'source': 'tap',
-                    'message': message,
-                    'raw_data': message
+                    'message': text,
+                    'raw_data': message,
+                    **fields
                 })
 
         except Exception as e:
-            logger.error(f"Error processing TAP message: {e}", exc_info=True)
+            logger.error("Error processing TAP message: %s", e, exc_info=True)
+
+    def _reap_clients(self):
+        """Forget client threads that have finished"""
+        self.client_threads = [thread for thread in self.client_threads if thread.is_alive()]
+
+    def live_connections(self):
+        return sum(1 for thread in self.client_threads if thread.is_alive())
 
     def is_running(self):
         return self.running and self.thread and self.thread.is_alive()
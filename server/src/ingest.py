@@ -0,0 +1,229 @@
+"""
+Alarm ingest runtime: handlers, alarm fan-out and startup timing.
+Deliberately free of Flask/SocketIO imports so listeners can start before the
+web stack is loaded.
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import deque
+from dotenv import load_dotenv
+
+from src.database.db import Database
+from src.handlers.serial_handler import SerialHandler
+from src.handlers.tap_handler import TAPHandler
+from src.handlers.serial_ip_handler import SerialIPHandler
+from src.handlers.connection_limiter import ConnectionLimiter
+from src.handlers.supervisor import HandlerSupervisor
+from src.notifications.dispatcher import NotificationDispatcher
+from src.parsers.registry import parser_from_settings
+from src.capture.recorder import CaptureRecorder
+from src.replication.replicator import Replicator
+from src.log_setup import setup_logging
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging (queued, sampled and rate-limited; see src/log_setup.py)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Wall-clock timestamps of startup milestones
+startup = {}
+
+_db = None
+
+# Handlers
+serial_handler = None
+tap_handler = None
+serial_ip_handler = None
+notification_dispatcher = None
+capture_recorder = None
+replicator = None
+supervisor = None
+
+# Alarms received before the web stack registers a broadcaster
+_broadcast = None
+_pending_broadcasts = deque(maxlen=1000)
+_broadcast_lock = threading.Lock()
+
+def mark_startup(event, timestamp=None):
+    startup[event] = timestamp or time.time()
+    if event != 'process_start' and 'process_start' in startup:
+        logger.info(f"Startup: {event} after {startup[event] - startup['process_start']:.3f}s")
+
+def get_startup_stats():
+    """Startup milestones as seconds since process start"""
+    origin = startup.get('process_start')
+    stats = {event: timestamp for event, timestamp in startup.items()}
+    if origin:
+        for event, timestamp in startup.items():
+            if event != 'process_start':
+                stats[f'{event}_seconds'] = round(timestamp - origin, 3)
+    return stats
+
+def get_db():
+    global _db
+    if _db is None:
+        _db = Database(os.getenv('DB_PATH', 'data/appear.db'))
+    return _db
+
+def set_broadcaster(broadcast):
+    """Register the SocketIO emitter and flush alarms that arrived before it existed"""
+    global _broadcast
+    with _broadcast_lock:
+        _broadcast = broadcast
+        pending = list(_pending_broadcasts)
+        _pending_broadcasts.clear()
+    for alarm_data in pending:
+        broadcast(alarm_data)
+    if pending:
+        logger.info(f"Broadcast {len(pending)} alarm(s) received during startup")
+
+def alarm_callback(alarm_data):
+    """Callback when new alarm received - send to connected apps"""
+    with _broadcast_lock:
+        broadcast = _broadcast
+        if broadcast is None:
+            _pending_broadcasts.append(alarm_data)
+    if broadcast:
+        broadcast(alarm_data)
+    if notification_dispatcher:
+        notification_dispatcher.enqueue(alarm_data)
+    logger.debug("Alarm broadcasted to connected apps: %s", alarm_data['id'])
+
+def get_handler_status():
+    return {
+        'serial': serial_handler.is_running() if serial_handler else False,
+        'tap': tap_handler.is_running() if tap_handler else False,
+        'serial_ip': serial_ip_handler.is_running() if serial_ip_handler else False
+    }
+
+def get_connection_stats():
+    """Admission control counters for each TCP listener"""
+    return {
+        'tap': tap_handler.limiter.get_stats() if tap_handler else None,
+        'serial_ip': serial_ip_handler.limiter.get_stats() if serial_ip_handler else None
+    }
+
+def get_handler_health():
+    """Supervisor view of each handler: status, uptime, restarts, connections, message age"""
+    return supervisor.get_health() if supervisor else {}
+
+def start_handlers():
+    """Start serial, TAP, and Serial over IP handlers and notification dispatch based on settings"""
+    global serial_handler, tap_handler, serial_ip_handler, notification_dispatcher, capture_recorder, replicator
+    global supervisor
+
+    db = get_db()
+
+    # Watch listener threads and restart any that die; sources that fail to
+    # start at all are reported to it as failed
+    supervisor = HandlerSupervisor()
+
+    # Raw traffic capture shared by the TCP listeners
+    try:
+        capture_recorder = CaptureRecorder.from_settings(db)
+    except Exception as e:
+        logger.error(f"Failed to start ingest capture: {e}")
+
+    # Start outbound notifications before any alarms can arrive
+    try:
+        notification_dispatcher = NotificationDispatcher.from_settings(db)
+        notification_dispatcher.start()
+    except Exception as e:
+        logger.error(f"Failed to start notification dispatcher: {e}")
+
+    # Start serial handler if enabled
+    if db.get_setting('serial_enabled', 'false').lower() == 'true':
+        try:
+            serial_port = db.get_setting('serial_port', '/dev/ttyUSB0')
+            serial_baud = db.get_setting('serial_baud_rate', '9600')
+            serial_handler = SerialHandler(serial_port, serial_baud, alarm_callback,
+                                           parser=parser_from_settings(db, 'serial', 'fire_panel'))
+            serial_handler.start()
+        except Exception as e:
+            logger.error(f"Failed to start serial handler: {e}")
+            serial_handler = None
+            supervisor.record_failure('serial', e)
+
+    # Start TAP handler if enabled
+    if db.get_setting('tap_enabled', 'false').lower() == 'true':
+        try:
+            tap_host = db.get_setting('tap_host', '0.0.0.0')
+            tap_port = db.get_setting('tap_port', '18001')
+            tap_handler = TAPHandler(tap_host, tap_port, alarm_callback,
+                                     limiter=ConnectionLimiter.from_settings(db),
+                                     parser=parser_from_settings(db, 'tap', 'tap'),
+                                     capture=capture_recorder)
+            tap_handler.start()
+        except Exception as e:
+            logger.error(f"Failed to start TAP handler: {e}")
+            tap_handler = None
+            supervisor.record_failure('tap', e)
+
+    # Start Serial over IP handler if enabled
+    if db.get_setting('serial_ip_enabled', 'false').lower() == 'true':
+        try:
+            serial_ip_host = db.get_setting('serial_ip_host', 'localhost')
+            serial_ip_port = db.get_setting('serial_ip_port', '5001')
+            serial_ip_handler = SerialIPHandler(serial_ip_host, serial_ip_port, alarm_callback,
+                                                limiter=ConnectionLimiter.from_settings(db),
+                                                parser=parser_from_settings(db, 'serial_ip', 'fire_panel'),
+                                                capture=capture_recorder)
+            serial_ip_handler.start()
+        except Exception as e:
+            logger.error(f"Failed to start Serial over IP handler: {e}")
+            serial_ip_handler = None
+            supervisor.record_failure('serial_ip', e)
+
+    for name, handler in (('serial', serial_handler), ('tap', tap_handler), ('serial_ip', serial_ip_handler)):
+        if handler:
+            supervisor.watch(name, handler)
+    supervisor.start()
+
+    # Serve the alarm lists from memory (new alarms are added as they are saved)
+    try:
+        db.warm_recent_alarms()
+    except Exception as e:
+        logger.error(f"Failed to load recent alarms: {e}")
+
+    # Pull alarms from other sites
+    try:
+        replicator = Replicator.from_settings(db)
+        replicator.start()
+    except Exception as e:
+        logger.error(f"Failed to start replicator: {e}")
+
+    if 'ingest_ready' not in startup:
+        mark_startup('ingest_ready')
+
+def restart_handlers():
+    """Restart handlers with new settings"""
+    global serial_handler, tap_handler, serial_ip_handler, notification_dispatcher, capture_recorder, replicator
+    global supervisor
+
+    # Stop the supervisor first so it does not restart handlers being shut down
+    if supervisor:
+        supervisor.stop()
+
+    # Stop existing handlers
+    if serial_handler:
+        serial_handler.stop()
+    if tap_handler:
+        tap_handler.stop()
+    if serial_ip_handler:
+        serial_ip_handler.stop()
+    if notification_dispatcher:
+        notification_dispatcher.stop()
+    if capture_recorder:
+        capture_recorder.shutdown()
+    if replicator:
+        replicator.stop()
+    serial_handler = tap_handler = serial_ip_handler = notification_dispatcher = capture_recorder = None
+    replicator = supervisor = None
+
+    # Start with new settings
+    start_handlers()
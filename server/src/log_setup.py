@@ -0,0 +1,205 @@
+"""
+Logging setup: records are queued by the calling thread and written by a
+background listener, so alarm handlers never block on the console or the SD card.
+
+Environment:
+    LOG_LEVEL          root level (default INFO)
+    LOG_FILE           size-rotated log file; empty for console only
+    LOG_MAX_BYTES      rotate the file at this size (default 5 MB)
+    LOG_BACKUP_COUNT   rotated files to keep (default 3)
+    LOG_QUEUE_SIZE     records buffered before DEBUG/INFO ones are dropped (default 10000)
+    LOG_SAMPLE         keep 1 in N DEBUG/INFO records per module, e.g. "src.handlers=10"
+    LOG_REPEAT_LIMIT   identical messages allowed per window (default 20, 0 = unlimited)
+    LOG_REPEAT_WINDOW  repeat window in seconds (default 60)
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import threading
+import logging
+import logging.handlers
+from collections import OrderedDict
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_stats = {'queued': 0, 'dropped': 0, 'sampled_out': 0, 'suppressed': 0}
+_stats_lock = threading.Lock()
+_listener = None
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+def parse_sample_rates(spec):
+    """Parse "module=N,module=N" into {module: N}"""
+    rates = {}
+    for item in (spec or '').split(','):
+        name, _, every = item.partition('=')
+        if name.strip() and every.strip():
+            rates[name.strip()] = max(1, int(every))
+    return rates
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 in N records below WARNING for the configured logger prefixes"""
+
+    def __init__(self, rates):
+        super().__init__()
+        # Longest prefix first so "src.handlers.tap_handler" wins over "src.handlers"
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def _rate(self, name):
+        for prefix, every in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return prefix, every
+        return None, 1
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        prefix, every = self._rate(record.name)
+        if every <= 1:
+            return True
+        with self.lock:
+            count = self.counters.get(prefix, 0)
+            self.counters[prefix] = count + 1
+        if count % every == 0:
+            return True
+        _count('sampled_out')
+        return False
+
+class RepeatFilter(logging.Filter):
+    """Let at most `limit` identical messages through per window.
+
+    Keys on the template and its arguments rather than the formatted text, so
+    the check stays cheap and distinct alarms are never collapsed. At most
+    `max_keys` messages are tracked; the least recently seen is forgotten first.
+    """
+
+    def __init__(self, limit=20, window=60, max_keys=10000):
+        super().__init__()
+        self.limit = int(limit)
+        self.window = float(window)
+        self.max_keys = max(1, int(max_keys))
+        self.seen = OrderedDict()
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0:
+            return True
+        key = (record.name, record.levelno, record.msg, record.args)
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable arguments (lists, dicts) are never repeat-limited
+            return True
+        now = time.monotonic()
+        with self.lock:
+            started, count, suppressed = self.seen.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            count += 1
+            if count > self.limit:
+                self.seen[key] = (started, count, suppressed + 1)
+                self.seen.move_to_end(key)
+                _count('suppressed')
+                return False
+            self.seen[key] = (started, count, 0)
+            self.seen.move_to_end(key)
+            if len(self.seen) > self.max_keys:
+                self.seen.popitem(last=False)
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar message(s) suppressed]"
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue records without formatting them; when the queue is full, drop DEBUG/INFO only"""
+
+    def prepare(self, record):
+        # The queue never leaves this process, so formatting is left to the
+        # listener thread instead of the thread that logged the record
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            _count('queued')
+            return
+        except queue.Full:
+            pass
+        if record.levelno < logging.WARNING or not self._make_room(record):
+            _count('dropped')
+            return
+        _count('queued')
+
+    def _make_room(self, record):
+        """Put a WARNING+ record in place of the oldest queued DEBUG/INFO record"""
+        q = self.queue
+        with q.mutex:
+            for index, queued in enumerate(q.queue):
+                if queued is not None and queued.levelno < logging.WARNING:
+                    del q.queue[index]
+                    q.queue.append(record)
+                    q.not_empty.notify()
+                    _count('dropped')
+                    return True
+        # Nothing to evict: the queue is all warnings and errors, so wait for the listener
+        try:
+            q.put(record, timeout=1)
+            return True
+        except queue.Full:
+            return False
+
+def setup_logging():
+    """Route all logging through a background queue listener; safe to call twice"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    formatter = logging.Formatter(FORMAT)
+
+    outputs = [logging.StreamHandler(sys.stderr)]
+    log_file = os.getenv('LOG_FILE', '')
+    if log_file:
+        try:
+            os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+            outputs.append(logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=int(os.getenv('LOG_MAX_BYTES', 5 * 1024 * 1024)),
+                backupCount=int(os.getenv('LOG_BACKUP_COUNT', 3)),
+                encoding='utf-8'
+            ))
+        except OSError as e:
+            print(f"Cannot open log file {log_file}: {e}", file=sys.stderr)
+    for output in outputs:
+        output.setFormatter(formatter)
+
+    handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', 10000))))
+    handler.addFilter(SamplingFilter(parse_sample_rates(os.getenv('LOG_SAMPLE', ''))))
+    handler.addFilter(RepeatFilter(os.getenv('LOG_REPEAT_LIMIT', 20), os.getenv('LOG_REPEAT_WINDOW', 60)))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, *outputs, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_log_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,235 @@
+import json
+import queue
+import random
+import threading
+import time
+import logging
+
+from src.notifications.providers import NotificationError, create_provider
+
+logger = logging.getLogger(__name__)
+
+class NotificationTarget:
+    """A configured destination with its own queue and worker pool"""
+
+    def __init__(self, config):
+        self.name = config['name']
+        self.config = config
+        self.max_concurrency = max(1, int(config.get('max_concurrency', 1)))
+        self.queue = queue.Queue()
+        self.counters = {'sent': 0, 'retried': 0, 'failed': 0}
+        self.last_error = None
+
+class NotificationDispatcher:
+    """Fans new alarms out to webhook, SMTP and push targets off the ingest path"""
+
+    def __init__(self, db, targets_config, max_attempts=8, base_delay=2.0, max_delay=600.0):
+        self.db = db
+        self.targets = {}
+        for config in targets_config:
+            if config.get('enabled', True) is False:
+                continue
+            target = NotificationTarget(config)
+            self.targets[target.name] = target
+        self.max_attempts = int(max_attempts)
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.intake = queue.Queue()
+        # Outcomes the DB could not record (e.g. "database is locked"), written
+        # again by the retry loop: (target, queue_id, attempts, error or None if sent)
+        self.unrecorded = []
+        self.running = False
+        self.threads = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, db):
+        """Build a dispatcher from the notification_* settings"""
+        try:
+            targets = json.loads(db.get_setting('notification_targets', '[]') or '[]')
+        except ValueError as e:
+            logger.error(f"Invalid notification_targets setting: {e}")
+            targets = []
+        max_attempts = db.get_setting('notification_max_attempts', '8')
+        try:
+            max_attempts = int(float(max_attempts))
+            if max_attempts < 1:
+                raise ValueError('must be at least 1')
+        except (TypeError, ValueError, OverflowError):
+            # A bad value must not disable every target; fall back to the default
+            logger.warning(f"Invalid notification_max_attempts {max_attempts!r}, using 8")
+            max_attempts = 8
+        return cls(db, targets, max_attempts=max_attempts)
+
+    def start(self):
+        if self.running or not self.targets:
+            return
+
+        self.running = True
+
+        # Resume anything left in flight by the previous run
+        for row in self.db.get_pending_notifications():
+            self._route(row['id'], row['target'], row['attempts'], row['payload'])
+
+        self._spawn(self._intake_loop, 'notify-intake')
+        self._spawn(self._retry_loop, 'notify-retry')
+        for target in self.targets.values():
+            for index in range(target.max_concurrency):
+                self._spawn(self._worker_loop, f"notify-{target.name}-{index}", target)
+        logger.info(f"Notification dispatcher started with {len(self.targets)} target(s)")
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+        logger.info("Notification dispatcher stopped")
+
+    def enqueue(self, alarm_data):
+        """Called from alarm_callback; never blocks on the network or DB"""
+        if self.running:
+            self.intake.put(alarm_data)
+
+    def _spawn(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _route(self, queue_id, target_name, attempts, payload):
+        target = self.targets.get(target_name)
+        if target is None:
+            self.db.update_notification(queue_id, 'failed', attempts, 0, 'Target no longer configured')
+            return
+        target.queue.put((queue_id, attempts, json.loads(payload)))
+
+    def _intake_loop(self):
+        while self.running:
+            try:
+                alarm_data = self.intake.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                payload = json.dumps(alarm_data, default=str)
+                queue_ids = self.db.enqueue_notifications(
+                    alarm_data.get('id'), payload, list(self.targets))
+                for target_name, queue_id in queue_ids.items():
+                    self.targets[target_name].queue.put((queue_id, 0, alarm_data))
+            except Exception as e:
+                # Keep the alarm and try again shortly rather than never notifying it
+                logger.error(f"Error queueing notification, retrying: {e}", exc_info=True)
+                time.sleep(1)
+                self.intake.put(alarm_data)
+
+    def _retry_loop(self):
+        while self.running:
+            time.sleep(1)
+            try:
+                self._record_unrecorded()
+                for row in self.db.claim_due_notifications(time.time()):
+                    self._route(row['id'], row['target'], row['attempts'], row['payload'])
+            except Exception as e:
+                logger.error(f"Error scheduling notification retries: {e}", exc_info=True)
+
+    def _worker_loop(self, target):
+        try:
+            provider = create_provider(target.config)
+        except Exception as e:
+            target.last_error = str(e)
+            logger.error(f"Cannot create notification target {target.name}: {e}")
+            return
+
+        # The provider knows how many alarms one send can carry (SMTP session, JSON array, ...)
+        batch_size = max(1, provider.batch_size)
+        try:
+            while self.running:
+                try:
+                    batch = [target.queue.get(timeout=1)]
+                except queue.Empty:
+                    continue
+                while len(batch) < batch_size:
+                    try:
+                        batch.append(target.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._deliver(target, provider, batch)
+                except Exception as e:
+                    target.last_error = str(e)
+                    logger.error(f"Error delivering notifications to {target.name}: {e}", exc_info=True)
+                    time.sleep(1)
+        finally:
+            provider.close()
+
+    def _deliver(self, target, provider, batch):
+        try:
+            provider.send([payload for _, _, payload in batch])
+        except Exception as e:
+            if not isinstance(e, NotificationError):
+                logger.error(f"Unexpected error sending to {target.name}: {e}", exc_info=True)
+            target.last_error = str(e)
+            # Alarms delivered before the failure must not be sent twice
+            sent = getattr(e, 'sent', 0)
+            self._record(target, batch[:sent])
+            self._record(target, batch[sent:], str(e))
+            return
+
+        self._record(target, batch)
+
+    def _record(self, target, batch, error=None):
+        """Mark a batch sent (error None) or schedule its retries; keep what the DB rejects"""
+        done = 0
+        try:
+            if error is None:
+                self._mark_sent(target, batch)
+                done = len(batch)
+            else:
+                for queue_id, attempts, _ in batch:
+                    self._schedule_retry(target, queue_id, attempts + 1, error)
+                    done += 1
+        except Exception as e:
+            # Left as 'pending', these rows would otherwise wait for the next restart
+            target.last_error = str(e)
+            logger.error(f"Cannot record notification outcome for {target.name}, will try again: {e}")
+            with self.lock:
+                self.unrecorded.extend((target, queue_id, attempts, error)
+                                       for queue_id, attempts, _ in batch[done:])
+
+    def _record_unrecorded(self):
+        with self.lock:
+            pending, self.unrecorded = self.unrecorded, []
+        for target, queue_id, attempts, error in pending:
+            self._record(target, [(queue_id, attempts, None)], error)
+
+    def _mark_sent(self, target, batch):
+        if not batch:
+            return
+        self.db.delete_notifications([queue_id for queue_id, _, _ in batch])
+        with self.lock:
+            target.counters['sent'] += len(batch)
+
+    def _schedule_retry(self, target, queue_id, attempts, error):
+        if attempts >= self.max_attempts:
+            self.db.update_notification(queue_id, 'failed', attempts, 0, error)
+            with self.lock:
+                target.counters['failed'] += 1
+            logger.error(f"Giving up on notification {queue_id} to {target.name} after {attempts} attempts: {error}")
+            return
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        delay += random.uniform(0, delay * 0.1)
+        self.db.update_notification(queue_id, 'retry', attempts, time.time() + delay, error)
+        with self.lock:
+            target.counters['retried'] += 1
+        logger.warning(f"Notification {queue_id} to {target.name} failed ({error}), retrying in {delay:.0f}s")
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                name: {
+                    'provider': target.config.get('provider'),
+                    'queued': target.queue.qsize(),
+                    'last_error': target.last_error,
+                    **target.counters
+                }
+                for name, target in self.targets.items()
+            }
@@ -0,0 +1,186 @@
+import http.client
+import json
+import smtplib
+import logging
+from email.message import EmailMessage
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+class NotificationError(Exception):
+    """Raised when a send fails and should be retried.
+
+    `sent` counts the alarms at the start of the batch that were delivered
+    before the failure; only the rest need retrying.
+    """
+
+    def __init__(self, message, sent=0):
+        super().__init__(message)
+        self.sent = sent
+
+class KeepAliveConnection:
+    """Single persistent HTTP(S) connection, reopened when the server drops it"""
+
+    def __init__(self, url, timeout=10):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = parts.path or '/'
+        if parts.query:
+            self.path += '?' + parts.query
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def request(self, method, body, headers):
+        # A kept-alive socket may have been closed by the server; retry once on a fresh one
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request(method, self.path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, data
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.close()
+                if attempt:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+class WebhookProvider:
+    """POST alarms as JSON; batches are sent as a JSON array"""
+
+    def __init__(self, config):
+        self.config = config
+        self.batch_size = int(config.get('batch_size', 1))
+        self.headers = {'Content-Type': 'application/json', **config.get('headers', {})}
+        self.conn = KeepAliveConnection(config['url'], timeout=float(config.get('timeout', 10)))
+
+    def _post(self, body, headers):
+        try:
+            status, data = self.conn.request(self.config.get('method', 'POST'), body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            raise NotificationError(f"{type(e).__name__}: {e}") from e
+        if status >= 300:
+            raise NotificationError(f"HTTP {status}: {data[:200]!r}")
+
+    def send(self, alarms):
+        if len(alarms) == 1 and self.batch_size == 1:
+            body = alarms[0]
+        else:
+            body = alarms
+        self._post(json.dumps(body).encode('utf-8'), self.headers)
+
+    def close(self):
+        self.conn.close()
+
+class HttpPushProvider(WebhookProvider):
+    """Generic push service (ntfy, Gotify, etc.) with a templated text body"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.batch_size = 1
+        self.template = config.get('body', '[{source}] {message}')
+        self.headers = {'Content-Type': 'text/plain; charset=utf-8', **config.get('headers', {})}
+
+    def send(self, alarms):
+        for index, alarm in enumerate(alarms):
+            body = self.template.format_map(_Defaults(alarm))
+            try:
+                self._post(body.encode('utf-8'), self.headers)
+            except NotificationError as e:
+                raise NotificationError(str(e), sent=index) from e
+
+class SmtpProvider:
+    """Email alarms, reusing one SMTP session across sends"""
+
+    def __init__(self, config):
+        self.config = config
+        self.batch_size = int(config.get('batch_size', 10))
+        recipients = config['to']
+        self.recipients = [recipients] if isinstance(recipients, str) else list(recipients)
+        self.subject = config.get('subject', 'Alarm from {source}')
+        self.smtp = None
+
+    def _connect(self):
+        host = self.config['host']
+        port = int(self.config.get('port', 25))
+        timeout = float(self.config.get('timeout', 10))
+        if self.config.get('ssl'):
+            smtp = smtplib.SMTP_SSL(host, port, timeout=timeout)
+        else:
+            smtp = smtplib.SMTP(host, port, timeout=timeout)
+            if self.config.get('starttls'):
+                smtp.starttls()
+        if self.config.get('username'):
+            smtp.login(self.config['username'], self.config.get('password', ''))
+        return smtp
+
+    def _session(self):
+        if self.smtp is not None:
+            try:
+                if self.smtp.noop()[0] == 250:
+                    return self.smtp
+            except smtplib.SMTPException:
+                pass
+            self.close()
+        self.smtp = self._connect()
+        return self.smtp
+
+    def send(self, alarms):
+        sent = 0
+        try:
+            smtp = self._session()
+            for alarm in alarms:
+                message = EmailMessage()
+                message['From'] = self.config.get('from', 'appear@localhost')
+                message['To'] = ', '.join(self.recipients)
+                message['Subject'] = self.subject.format_map(_Defaults(alarm))
+                message.set_content(alarm.get('message', ''))
+                smtp.send_message(message)
+                sent += 1
+        except (OSError, smtplib.SMTPException) as e:
+            self.close()
+            raise NotificationError(f"{type(e).__name__}: {e}", sent=sent) from e
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+            self.smtp = None
+
+class _Defaults(dict):
+    """Leave unknown template fields blank instead of raising"""
+
+    def __missing__(self, key):
+        return ''
+
+PROVIDERS = {
+    'webhook': WebhookProvider,
+    'http_push': HttpPushProvider,
+    'smtp': SmtpProvider,
+}
+
+def create_provider(config):
+    provider = PROVIDERS.get(config.get('provider'))
+    if provider is None:
+        raise ValueError(f"Unknown notification provider: {config.get('provider')}")
+    return provider(config)
@@ -0,0 +1 @@
+# Parsers package
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Sample panel lines and the fields each parser should extract from them.
+
+Usage:
+    python -m src.parsers.examples
+
+Exits non-zero if any parser output differs from the table; run it after
+touching the parser regexes.
+"""
+
+import sys
+
+from src.parsers.registry import create_parser
+
+# (parser, line, expected fields other than 'message')
+EXAMPLES = [
+    ('fire_panel', 'FIRE ALARM ZONE 3 POINT 1-2-3 PANEL 2 10/15/24 14:02:11',
+     {'event_type': 'FIRE ALARM', 'zone': '3', 'point': '1-2-3', 'panel': '2', 'event_time': '10/15/24 14:02:11'}),
+    ('fire_panel', 'TROUBLE L01D023 SMOKE DET 2ND FLR Z005 02:14P 011524',
+     {'event_type': 'TROUBLE', 'zone': '005', 'point': 'L01D023', 'event_time': '02:14P'}),
+    ('fire_panel', 'SUPV PT12 NODE:4 TAMPER SWITCH',
+     {'event_type': 'SUPERVISORY', 'point': '12', 'panel': '4'}),
+    ('fire_panel', 'ALARM DEV# 1-045 PNL-3 ZN-7 3RD FLOOR',
+     {'event_type': 'ALARM', 'zone': '7', 'point': '1-045', 'panel': '3'}),
+    ('fire_panel', 'FAULT ADDRESS 0042 GROUND FAULT',
+     {'event_type': 'TROUBLE', 'point': '0042'}),
+    ('fire_panel', 'SYSTEM RESET 08:30 AM',
+     {'event_type': 'RESET', 'event_time': '08:30 AM'}),
+    # Keywords must not match the start of longer words
+    ('fire_panel', 'ALL PANELS NORMAL', {}),
+    ('fire_panel', 'Zone restored at DEVELOPMENT2', {'event_type': 'RESTORE'}),
+    ('tap', '\x021234567\rFIRE ALARM ZONE 12 LOBBY PULL STATION\r\x03A1B',
+     {'event_type': 'FIRE ALARM', 'zone': '12', 'pager_id': '1234567'}),
+    ('pocsag', 'POCSAG1200: Address:  1234567  Function: 0  Alpha:   FIRE ALARM Z7 12:00',
+     {'event_type': 'FIRE ALARM', 'zone': '7', 'event_time': '12:00', 'pager_id': '1234567'}),
+]
+
+def check_examples():
+    """Return (parser, line, expected, actual) for every example that no longer parses as listed"""
+    failures = []
+    for name, line, expected in EXAMPLES:
+        actual = create_parser(name).parse(line)
+        actual.pop('message', None)
+        if actual != expected:
+            failures.append((name, line, expected, actual))
+    return failures
+
+def main():
+    failures = check_examples()
+    for name, line, expected, actual in failures:
+        print(f"[FAIL] {name}: {line!r}\n  expected {expected}\n  got      {actual}")
+    if failures:
+        return 1
+    print(f"[OK] {len(EXAMPLES)} parser examples")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
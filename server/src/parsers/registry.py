@@ -0,0 +1,152 @@
+import re
+import threading
+import logging
+from src.database.db import ALARM_FIELDS as FIELDS
+
+logger = logging.getLogger(__name__)
+
+class RawParser:
+    """Store the message as received"""
+
+    def parse(self, message):
+        return {'message': message}
+
+class FirePanelParser:
+    """Keyword extraction for common fire panel printer/serial output"""
+
+    EVENT = re.compile(
+        r'\b(FIRE\s+ALARM|PRE-?ALARM|ALARM|TROUBLE|FAULT|SUPERVISORY|SUPV|RESTORED?|RESET|'
+        r'SILENCED?|DISABLED?|ENABLED?|ACKNOWLEDGED?|ACK|EVACUATE|TEST)\b', re.IGNORECASE)
+    # A keyword must be followed by a separator or directly by a digit ("Z005", "PT12"),
+    # so it never matches the start of a longer word ("PANELS", "DEVELOPMENT2")
+    KEYWORD_END = r'(?:[\s:#.-]+|(?=\d))'
+    ZONE = re.compile(r'\b(?:ZONE|ZN|Z)' + KEYWORD_END + r'([A-Z]?\d+)\b', re.IGNORECASE)
+    POINT = re.compile(
+        r'\b(?:POINT|PT|DEVICE|DEV|ADDR(?:ESS)?)' + KEYWORD_END + r'([\w-]*\d[\w-]*)'
+        r'|\b(L\d{1,2}[DM]\d{2,3})\b'
+        r'|\b(\d{1,3}-\d{1,3}-\d{1,3})\b', re.IGNORECASE)
+    PANEL = re.compile(r'\b(?:PANEL|NODE|PNL)' + KEYWORD_END + r'(\w+)', re.IGNORECASE)
+    TIME = re.compile(
+        r'(?:(\d{1,4}[/-]\d{1,2}[/-]\d{2,4})[\sT,]+)?'
+        r'\b(\d{1,2}:\d{2}(?::\d{2})?(?:\s?[AP]M?\b)?)', re.IGNORECASE)
+
+    EVENT_NAMES = {
+        'SUPV': 'SUPERVISORY',
+        'FAULT': 'TROUBLE',
+        'PREALARM': 'PRE-ALARM',
+        'RESTORED': 'RESTORE',
+        'SILENCE': 'SILENCED',
+        'DISABLE': 'DISABLED',
+        'ENABLE': 'ENABLED',
+        'ACK': 'ACKNOWLEDGED',
+        'ACKNOWLEDGE': 'ACKNOWLEDGED',
+    }
+
+    def parse(self, message):
+        fields = {'message': message}
+
+        match = self.EVENT.search(message)
+        if match:
+            event = ' '.join(match.group(1).upper().split())
+            fields['event_type'] = self.EVENT_NAMES.get(event, event)
+
+        match = self.ZONE.search(message)
+        if match:
+            fields['zone'] = match.group(1).upper()
+
+        match = self.POINT.search(message)
+        if match:
+            fields['point'] = next(group for group in match.groups() if group).upper()
+
+        match = self.PANEL.search(message)
+        if match:
+            fields['panel'] = match.group(1)
+
+        match = self.TIME.search(message)
+        if match:
+            fields['event_time'] = ' '.join(group for group in match.groups() if group)
+
+        return fields
+
+class TAPParser(FirePanelParser):
+    """TAP block: STX pager-id CR message CR ETX checksum"""
+
+    BLOCK = re.compile(r'\x02(.*?)\x03', re.DOTALL)
+
+    def parse(self, message):
+        match = self.BLOCK.search(message)
+        block = match.group(1) if match else message
+        pager_id, sep, text = block.strip('\r\n').partition('\r')
+        if not sep:
+            return super().parse(message)
+
+        fields = super().parse(' '.join(text.split('\r')).strip())
+        fields['pager_id'] = pager_id.strip()
+        return fields
+
+class POCSAGParser(FirePanelParser):
+    """Decoded pager output, e.g. multimon-ng 'POCSAG1200: Address: 123 Function: 0 Alpha: ...'"""
+
+    LINE = re.compile(
+        r'(?:POCSAG\d*|FLEX)\S*:?\s*Address:\s*(\d+)\s*(?:Function:\s*\d+\s*)?'
+        r'(?:Alpha|Numeric):\s*(.*)', re.IGNORECASE | re.DOTALL)
+
+    def parse(self, message):
+        match = self.LINE.search(message)
+        if not match:
+            return super().parse(message)
+
+        fields = super().parse(match.group(2).strip())
+        fields['pager_id'] = match.group(1)
+        return fields
+
+class RegexParser:
+    """User template: a regex whose named groups match FIELDS (and optionally 'message')"""
+
+    def __init__(self, pattern):
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        unknown = set(self.regex.groupindex) - set(FIELDS) - {'message'}
+        if unknown:
+            raise ValueError(f"Unknown parser field(s): {', '.join(sorted(unknown))}")
+
+    def parse(self, message):
+        fields = {'message': message}
+        match = self.regex.search(message)
+        if match:
+            for key, value in match.groupdict().items():
+                if value:
+                    fields[key] = value.strip()
+        return fields
+
+PARSERS = {
+    'raw': RawParser,
+    'fire_panel': FirePanelParser,
+    'tap': TAPParser,
+    'pocsag': POCSAGParser,
+    'regex': RegexParser,
+}
+
+_instances = {}
+_lock = threading.Lock()
+
+def create_parser(name, pattern=None):
+    """Return a shared parser instance; regexes are compiled once per (name, pattern)"""
+    key = (name, pattern if name == 'regex' else None)
+    with _lock:
+        parser = _instances.get(key)
+        if parser is None:
+            factory = PARSERS.get(name)
+            if factory is None:
+                raise ValueError(f"Unknown parser: {name}")
+            parser = factory(pattern) if name == 'regex' else factory()
+            _instances[key] = parser
+    return parser
+
+def parser_from_settings(db, source, default):
+    """Parser configured for a source via the <source>_parser setting"""
+    name = db.get_setting(f'{source}_parser', default)
+    try:
+        return create_parser(name, db.get_setting('parser_regex', ''))
+    except (ValueError, re.error) as e:
+        logger.error(f"Invalid parser '{name}' for {source}, storing raw messages: {e}")
+        return create_parser('raw')
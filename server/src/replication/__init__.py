@@ -0,0 +1 @@
+# Replication package
@@ -0,0 +1,31 @@
+import json
+import socket
+import zlib
+
+def get_site_name(db):
+    return db.get_setting('site_name', '') or socket.gethostname()
+
+def generate_feed(db, since_id, limit, page_size=500, compress=False):
+    """Yield NDJSON lines of local alarms after since_id, gzip-compressed per page if requested"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    remaining = limit
+
+    while remaining > 0:
+        rows = db.get_local_alarms_since(since_id, min(page_size, remaining))
+        if not rows:
+            break
+
+        chunk = ''.join(json.dumps(dict(row), separators=(',', ':')) + '\n' for row in rows).encode('utf-8')
+        since_id = rows[-1]['id']
+        remaining -= len(rows)
+
+        if compressor:
+            # Sync flush so each page reaches the client without waiting for the next
+            chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield chunk
+
+        if len(rows) < page_size:
+            break
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,162 @@
+import http.client
+import json
+import threading
+import time
+import zlib
+import logging
+from urllib.parse import urlsplit, urlencode
+
+logger = logging.getLogger(__name__)
+
+class ReplicationError(Exception):
+    """Raised when a peer's feed cannot be fetched"""
+
+class PeerFeed:
+    """Pulls one remote site's alarm feed over a reused HTTP connection"""
+
+    def __init__(self, config, timeout=30):
+        parts = urlsplit(config['url'].rstrip('/'))
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {config['url']}")
+        self.name = config['name']
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.base_path = parts.path
+        self.token = config.get('token')
+        self.interval = float(config.get('interval', 5))
+        self.timeout = timeout
+        self.conn = None
+        self.bytes_received = 0
+
+    def _connect(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def fetch(self, since_id, limit):
+        """Return (site_name, alarms) for alarms after since_id"""
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        path = f"{self.base_path}/api/alarms/feed?{urlencode({'since': since_id, 'limit': limit})}"
+
+        try:
+            if self.conn is None:
+                self.conn = self._connect()
+            self.conn.request('GET', path, headers=headers)
+            response = self.conn.getresponse()
+            body = response.read()
+            if response.will_close:
+                self.close()
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            raise ReplicationError(f"{type(e).__name__}: {e}") from e
+
+        if response.status != 200:
+            raise ReplicationError(f"HTTP {response.status}: {body[:200]!r}")
+
+        self.bytes_received += len(body)
+        if response.getheader('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 31)
+        alarms = [json.loads(line) for line in body.splitlines() if line.strip()]
+        return response.getheader('X-Site-Name'), alarms
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+class Replicator:
+    """Tails the alarm feeds of remote sites and merges them into the local database"""
+
+    def __init__(self, db, peers_config, batch_size=500, max_backoff=60):
+        self.db = db
+        self.batch_size = int(batch_size)
+        self.max_backoff = max_backoff
+        self.peers = []
+        for config in peers_config:
+            if config.get('enabled', True) is False:
+                continue
+            # Alarms are deduplicated per peer name, so two peers must never share one
+            if not config.get('name') or any(peer.name == config['name'] for peer in self.peers):
+                logger.error(f"Skipping replication peer with missing or duplicate name: {config}")
+                continue
+            self.peers.append(PeerFeed(config))
+        self.stats = {
+            peer.name: {'site': None, 'last_id': None, 'replicated': 0, 'bytes_received': 0,
+                        'last_sync': None, 'last_error': None}
+            for peer in self.peers
+        }
+        self.running = False
+        self.threads = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, db):
+        """Build a replicator from the replication_* settings"""
+        try:
+            peers = json.loads(db.get_setting('replication_peers', '[]') or '[]')
+        except ValueError as e:
+            logger.error(f"Invalid replication_peers setting: {e}")
+            peers = []
+        return cls(db, peers, batch_size=db.get_setting('replication_batch_size', '500'))
+
+    def start(self):
+        if self.running or not self.peers:
+            return
+        self.running = True
+        for peer in self.peers:
+            thread = threading.Thread(target=self._run_peer, args=(peer,), name=f"replicate-{peer.name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Replicator started for {len(self.peers)} peer(s)")
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+        for peer in self.peers:
+            peer.close()
+        logger.info("Replicator stopped")
+
+    def sync_once(self, peer):
+        """Pull one batch from a peer; returns the number of alarms received"""
+        last_id = self.db.get_replication_checkpoint(peer.name)
+        site, alarms = peer.fetch(last_id, self.batch_size)
+        inserted = self.db.save_replicated_alarms(peer.name, alarms)
+        with self.lock:
+            stats = self.stats[peer.name]
+            # Informational only; the remote's own name need not be unique
+            stats['site'] = site
+            stats['last_id'] = alarms[-1]['id'] if alarms else last_id
+            stats['replicated'] += inserted
+            stats['last_sync'] = time.time()
+            stats['last_error'] = None
+            stats['bytes_received'] = peer.bytes_received
+        return len(alarms)
+
+    def _wait(self, seconds):
+        deadline = time.time() + seconds
+        while self.running and time.time() < deadline:
+            time.sleep(max(0, min(0.5, deadline - time.time())))
+
+    def _run_peer(self, peer):
+        backoff = peer.interval
+        while self.running:
+            try:
+                received = self.sync_once(peer)
+                backoff = peer.interval
+                # A full batch means the peer has more waiting; fetch it straight away
+                if received < self.batch_size:
+                    self._wait(peer.interval)
+            except Exception as e:
+                with self.lock:
+                    self.stats[peer.name]['last_error'] = str(e)
+                logger.warning(f"Replication from {peer.name} failed: {e}; retrying in {backoff:.0f}s")
+                self._wait(backoff)
+                backoff = min(self.max_backoff, backoff * 2)
+
+    def get_stats(self):
+        with self.lock:
+            return {name: dict(stats) for name, stats in self.stats.items()}